@@ -9,10 +9,14 @@ __version__ = "0.1.0"
 __author__ = "IA_Core Team"
 __license__ = "MIT"
 
-from .core.detector import ProjectDetector
-from .core.analyzer import IntelligentAnalyzer
-from .agent.autonomous import AutonomousAgent
-from .api.server import APIServer
+# Public classes are imported on first access (PEP 562) so that
+# `import iacore` does not pull in watchdog, FastAPI or the LLM stack.
+_LAZY_ATTRS = {
+    "ProjectDetector": ".core.detector",
+    "IntelligentAnalyzer": ".core.analyzer",
+    "AutonomousAgent": ".agent.autonomous",
+    "APIServer": ".api.server",
+}
 
 __all__ = [
     "ProjectDetector",
@@ -20,3 +24,19 @@ __all__ = [
     "AutonomousAgent",
     "APIServer",
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
@@ -10,21 +10,29 @@ This agent:
 """
 
 import asyncio
+import fnmatch
 import json
 import logging
 import os
+import platform
+import re
 import signal
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 from datetime import datetime
-from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 
+if TYPE_CHECKING:
+    from watchdog.observers.api import BaseObserver
+
 from ..core.detector import ProjectDetector
-from ..core.analyzer import IntelligentAnalyzer
+from ..core.analyzer import THREAD_PARSE_THRESHOLD, IntelligentAnalyzer
+from ..core.llm_cache import LLMCache, create_cache_backend
 from ..core.llm_client import LLMClient
 from ..core.opencore_executor import OpenCoreExecutor
+from ..core.task_store import TaskStore
 from ..utils.logger import setup_logger
 
 
@@ -54,14 +62,23 @@ class AutonomousAgent:
         self.config = self._load_config()
         
         # Initialize components
-        self.detector = ProjectDetector(self.project_root)
-        self.analyzer = IntelligentAnalyzer(
-            llm_model=self.config.get("llm", {}).get("model", "gpt-4o-mini")
+        cache_config = self.config.get("llm", {}).get("cache", {})
+        self.llm_cache = LLMCache(
+            backend=create_cache_backend(
+                cache_config.get("backend", "sqlite"),
+                url=cache_config.get("url", "redis://localhost:6379/0"),
+                max_entries=cache_config.get("max_entries", 10000),
+            ),
+            ttl_seconds=cache_config.get("ttl_seconds", 24 * 3600),
         )
+        self.detector = ProjectDetector(self.project_root)
         self.llm = LLMClient(
             model=self.config.get("llm", {}).get("model", "gpt-4o-mini"),
             provider=self.config.get("llm", {}).get("provider", "openai"),
+            cache=self.llm_cache,
         )
+        # Share one client so caching and request coalescing cover all calls
+        self.analyzer = IntelligentAnalyzer(llm=self.llm)
         self.executor = OpenCoreExecutor(
             project_root=self.project_root,
             silent_mode=True,
@@ -71,9 +88,18 @@ class AutonomousAgent:
         self.running = False
         self.context_cache: Dict[str, Any] = {}
         self.last_analysis: Optional[datetime] = None
+        self.task_store = TaskStore(self.project_root / ".iacore" / "runtime" / "tasks.db")
+        self._context_lock = asyncio.Lock()
+        self._task_event = asyncio.Event()
+        self._detect_cache: Optional[tuple] = None
+        self._ignore_re = self._compile_ignore_patterns(self._get_ignore_patterns())
+        self._repo = self._open_git_repo()
         
         # File watcher
-        self.observer: Optional[Observer] = None
+        self.observer: Optional["BaseObserver"] = None
+        self._event_handler: Optional["ProjectFileHandler"] = None
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None
         
         logger.info(f"AutonomousAgent initialized for: {self.project_root}")
 
@@ -94,10 +120,21 @@ class AutonomousAgent:
                 "auto_analyze": True,
                 "auto_execute": False,
                 "watch_mode": True,
+                "watch_interval": 30,
+                "debounce_ms": 200,
+                "max_batch": 500,
+                "concurrency": 4,
+                "io_threads": 4,
+                "task_poll_interval": 5,
             },
             "llm": {
                 "provider": "openai",
                 "model": "gpt-4o-mini",
+                "cache": {
+                    "backend": "sqlite",
+                    "ttl_seconds": 24 * 3600,
+                },
+                "context_budget_tokens": 2000,
             },
             "workflows": {
                 "on_file_change": ["detect_impact", "analyze_context"],
@@ -111,11 +148,21 @@ class AutonomousAgent:
         
         self.running = True
         
+        # Bounded pool for blocking filesystem/database work (asyncio.to_thread)
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=self.config.get("agent", {}).get("io_threads", 4),
+                thread_name_prefix="iacore-io",
+            )
+        )
+        
         # Initial project analysis
         await self._initial_analysis()
         
         # Start file watcher if enabled
         if self.config.get("agent", {}).get("watch_mode", True):
+            self._event_queue = asyncio.Queue()
+            self._batcher_task = asyncio.create_task(self._event_batcher())
             self._start_file_watcher()
         
         # Main loop
@@ -131,11 +178,19 @@ class AutonomousAgent:
         logger.info("🛑 Stopping AutonomousAgent...")
         
         self.running = False
+        self._task_event.set()  # Wake the main loop so it can exit
         
         if self.observer:
             self.observer.stop()
             self.observer.join()
         
+        if self._batcher_task:
+            self._batcher_task.cancel()
+            self._batcher_task = None
+        
+        await self.task_store.close()
+        await self.llm.close()
+        
         logger.info("Agent stopped")
 
     async def _initial_analysis(self):
@@ -143,28 +198,64 @@ class AutonomousAgent:
         logger.info("📊 Analyzing project...")
         
         # Detect project type
-        detection = self.detector.detect()
+        detection = await asyncio.to_thread(self._detect)
         logger.info(f"Detected: {detection['type']} (confidence: {detection['confidence']:.0%})")
         
-        # Store in context
-        self.context_cache["project_type"] = detection["type"]
-        self.context_cache["project_files"] = detection.get("files", [])
-        
         # Analyze with LLM
         analysis = await self.analyzer.analyze_project(
             project_root=self.project_root,
             project_type=detection["type"],
         )
         
-        self.context_cache["analysis"] = analysis
-        self.last_analysis = datetime.now()
+        # Store in context
+        async with self._context_lock:
+            self.context_cache["project_type"] = detection["type"]
+            self.context_cache["project_files"] = detection.get("files", [])
+            self.context_cache["analysis"] = analysis
+            self.last_analysis = datetime.now()
         
         logger.info(f"✓ Analysis complete: {len(analysis.get('insights', []))} insights")
 
+    def _detect(self) -> Dict:
+        """Run detection, reusing the last result while the manifests are unchanged."""
+        fingerprint = self.detector.fingerprint()
+        if self._detect_cache and self._detect_cache[0] == fingerprint:
+            return self._detect_cache[1]
+        
+        detection = self.detector.detect()
+        self._detect_cache = (fingerprint, detection)
+        return detection
+
+    def _open_git_repo(self):
+        """Open the project repository with pygit2, if available."""
+        try:
+            import pygit2
+        except ImportError:
+            return None
+        
+        try:
+            return pygit2.Repository(str(self.project_root))
+        except Exception as e:
+            logger.debug(f"pygit2 could not open repository: {e}")
+            return None
+
+    def _last_commit_info(self) -> Optional[str]:
+        """Short id and subject of HEAD, read in-process via pygit2."""
+        try:
+            commit = self._repo[self._repo.head.target]
+        except Exception as e:
+            logger.debug(f"Could not read HEAD: {e}")
+            return None
+        
+        subject = commit.message.splitlines()[0] if commit.message else ""
+        return f"{str(commit.id)[:12]} {subject}"
+
     async def _main_loop(self):
         """Main agent loop - processes tasks and monitors."""
         logger.info("👁️  Monitoring project...")
         
+        poll_interval = self.config.get("agent", {}).get("task_poll_interval", 5)
+        
         while self.running:
             try:
                 # Check for pending tasks
@@ -174,26 +265,66 @@ class AutonomousAgent:
                 if self._should_reanalyze():
                     await self._initial_analysis()
                 
-                # Sleep
-                await asyncio.sleep(5)
+                # Sleep until a task is queued in this process; the timeout
+                # picks up tasks queued by a separate API process.
+                try:
+                    await asyncio.wait_for(self._task_event.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._task_event.clear()
                 
             except Exception as e:
                 logger.error(f"Error in main loop: {e}", exc_info=True)
                 await asyncio.sleep(10)
 
+    def notify_new_task(self):
+        """Wake the main loop to pick up a newly queued task."""
+        self._task_event.set()
+
     async def _process_pending_tasks(self):
-        """Process any pending tasks in the queue."""
-        tasks_file = self.project_root / ".iacore" / "runtime" / "tasks.json"
-        
-        if not tasks_file.exists():
+        """Process any pending tasks in the queue with a bounded worker pool."""
+        # Tasks left "in_progress" by a previous run are not picked up again
+        pending = await self.task_store.pending()
+        if not pending:
             return
         
-        with open(tasks_file) as f:
-            tasks = json.load(f)
+        queue: asyncio.Queue = asyncio.Queue()
+        for task in pending:
+            queue.put_nowait(task)
         
-        for task in tasks:
-            if task.get("status") == "pending":
+        concurrency = self.config.get("agent", {}).get("concurrency", 4)
+        workers = [
+            asyncio.create_task(self._task_worker(queue))
+            for _ in range(min(concurrency, len(pending)))
+        ]
+        
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _task_worker(self, queue: asyncio.Queue):
+        """Worker: execute tasks from the queue until cancelled."""
+        while True:
+            task = await queue.get()
+            try:
+                await self._set_task_status(task["id"], "in_progress")
                 await self._execute_task(task)
+                await self._set_task_status(task["id"], "completed")
+            except Exception as e:
+                logger.error(f"Task {task.get('id')} failed: {e}", exc_info=True)
+                await self._set_task_status(task["id"], "failed")
+            finally:
+                queue.task_done()
+
+    async def _set_task_status(self, task_id: str, status: str):
+        """Update the status of a queued task."""
+        await self.task_store.update(
+            task_id,
+            status=status,
+            updated_at=datetime.now().isoformat(),
+        )
 
     async def _execute_task(self, task: Dict):
         """Execute a task using GPT-4o-mini + OpenCore."""
@@ -204,7 +335,10 @@ class AutonomousAgent:
         response = await self.llm.complete(prompt)
         
         # Parse commands from LLM response
-        commands = self._parse_commands(response)
+        if len(response) > THREAD_PARSE_THRESHOLD:
+            commands = await asyncio.to_thread(self._parse_commands, response)
+        else:
+            commands = self._parse_commands(response)
         
         # Execute via OpenCore (silent mode)
         for cmd in commands:
@@ -222,22 +356,66 @@ class AutonomousAgent:
 
     def _build_execution_prompt(self, task: Dict) -> str:
         """Build prompt for GPT-4o-mini to generate execution plan."""
-        context = self.context_cache.get("analysis", {})
+        context = self._pack_context(self.context_cache.get("analysis", {}))
         
+        # Everything up to TASK is identical across tasks, so it can be
+        # served from the provider's prompt prefix cache.
         return f"""You are an AI agent managing a {self.context_cache.get('project_type')} project.
 
+Generate a list of shell commands to complete the task below.
+Return ONLY the commands, one per line, with no explanation.
+Commands will be executed silently via OpenCore.
+
 PROJECT CONTEXT:
 {json.dumps(context, indent=2)}
 
 TASK:
 {task['description']}
 
-Generate a list of shell commands to complete this task.
-Return ONLY the commands, one per line, with no explanation.
-Commands will be executed silently via OpenCore.
-
 COMMANDS:"""
 
+    def _pack_context(self, analysis: Dict) -> Dict:
+        """
+        Fit the project analysis into the prompt token budget.
+        
+        Items are taken round-robin across categories (insights, risks, ...)
+        in the order the analysis listed them; whatever does not fit is
+        replaced by a one-line note of what was left out.
+        """
+        budget = self.config.get("llm", {}).get("context_budget_tokens", 2000)
+        categories = {
+            key: value if isinstance(value, list) else [value]
+            for key, value in analysis.items()
+        }
+        packed: Dict[str, List] = {key: [] for key in categories}
+        omitted: Dict[str, int] = {}
+        used = 0
+        
+        depth = max((len(items) for items in categories.values()), default=0)
+        for i in range(depth):
+            for key, items in categories.items():
+                if i >= len(items):
+                    continue
+                
+                cost = self.llm.count_tokens(json.dumps(items[i]))
+                if used + cost > budget:
+                    omitted[key] = omitted.get(key, 0) + 1
+                    continue
+                
+                packed[key].append(items[i])
+                used += cost
+        
+        # Non-list values go back in as they were
+        result: Dict[str, Any] = {
+            key: items if isinstance(analysis[key], list) else items[0]
+            for key, items in packed.items()
+            if items or isinstance(analysis[key], list)
+        }
+        if omitted:
+            result["omitted"] = ", ".join(f"{n} more {key}" for key, n in omitted.items())
+        
+        return result
+
     def _parse_commands(self, llm_response: str) -> List[str]:
         """Parse commands from LLM response."""
         lines = llm_response.strip().split("\n")
@@ -280,54 +458,169 @@ ALTERNATIVE:"""
 
     def _start_file_watcher(self):
         """Start watching file changes."""
-        event_handler = ProjectFileHandler(self)
-        self.observer = Observer()
-        self.observer.schedule(event_handler, str(self.project_root), recursive=True)
+        self._event_handler = ProjectFileHandler(self, asyncio.get_running_loop())
+        self.observer = self._create_observer()
+        
+        # Watch the root itself non-recursively and each top-level directory
+        # recursively, so ignored trees (.git, node_modules, ...) are never
+        # registered with the OS watcher or scanned by the polling fallback.
+        self.observer.schedule(self._event_handler, str(self.project_root), recursive=False)
+        try:
+            entries = list(os.scandir(self.project_root))
+        except OSError as e:
+            logger.error(f"Cannot list project root: {e}")
+            entries = []
+        
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                self._watch_directory(entry.path)
+        
         self.observer.start()
         
-        logger.info("📁 File watcher started")
+        logger.info(f"📁 File watcher started ({type(self.observer).__name__})")
 
-    async def on_file_change(self, path: str, event_type: str):
-        """Handle file change event."""
-        logger.debug(f"File {event_type}: {path}")
-        
-        # Skip ignored patterns
-        if self._should_ignore(path):
+    def _watch_directory(self, path: str):
+        """Schedule a recursive watch on a top-level project directory."""
+        if not self.observer or Path(path).name in self._ignored_dir_names():
             return
         
+        self.observer.schedule(self._event_handler, path, recursive=True)
+
+    def _ignored_dir_names(self) -> set:
+        """Top-level directory names excluded from watching."""
+        names = {".git", "node_modules", "__pycache__"}
+        for pattern in self._get_ignore_patterns():
+            if pattern.endswith("/**") and "/" not in pattern[:-3]:
+                names.add(pattern[:-3])
+        return names
+
+    def _create_observer(self) -> "BaseObserver":
+        """Pick the cheapest observer that works for the project filesystem."""
+        # Observer backends are only imported once watching actually starts
+        from watchdog.observers import Observer
+        
+        if self._is_network_mount(self.project_root):
+            from watchdog.observers.polling import PollingObserver
+            
+            interval = self.config.get("agent", {}).get("watch_interval", 30)
+            logger.info(f"Network filesystem detected, polling every {interval}s")
+            return PollingObserver(timeout=interval)
+        
+        system = platform.system()
+        try:
+            if system == "Linux":
+                from watchdog.observers.inotify import InotifyObserver
+                return InotifyObserver()
+            if system == "Darwin":
+                from watchdog.observers.fsevents import FSEventsObserver
+                return FSEventsObserver()
+        except Exception as e:
+            logger.warning(f"Native file watcher unavailable ({e}), using default")
+        
+        return Observer()
+
+    @staticmethod
+    def _is_network_mount(path: Path) -> bool:
+        """Check whether path lives on a network filesystem (Linux only)."""
+        network_types = {"nfs", "nfs4", "cifs", "smbfs", "smb3", "fuse.sshfs", "9p"}
+        mounts = Path("/proc/mounts")
+        if not mounts.exists():
+            return False
+        
+        target = str(path)
+        best_mount, best_type = "", ""
+        try:
+            for line in mounts.read_text().splitlines():
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point, fs_type = fields[1], fields[2]
+                prefix = mount_point.rstrip("/") + "/"
+                if (target == mount_point or target.startswith(prefix)) and \
+                   len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fs_type
+        except OSError:
+            return False
+        
+        return best_type in network_types
+
+    async def _event_batcher(self):
+        """Coalesce file events into batches and analyze each batch once."""
+        agent_config = self.config.get("agent", {})
+        debounce = agent_config.get("debounce_ms", 200) / 1000
+        max_batch = agent_config.get("max_batch", 500)
+        
+        while True:
+            path, event_type = await self._event_queue.get()
+            batch = {path: event_type}
+            
+            # Keep collecting until the burst goes quiet or the batch is full;
+            # the last event seen for a path wins.
+            while len(batch) < max_batch:
+                try:
+                    path, event_type = await asyncio.wait_for(
+                        self._event_queue.get(), timeout=debounce
+                    )
+                except asyncio.TimeoutError:
+                    break
+                batch[path] = event_type
+            
+            try:
+                await self.on_file_changes(batch)
+            except Exception as e:
+                logger.error(f"Error handling file changes: {e}", exc_info=True)
+
+    async def on_file_changes(self, changes: Dict[str, str]):
+        """
+        Handle a batch of file change events (path -> event type).
+        
+        Ignored paths never get here; ProjectFileHandler drops them.
+        """
+        logger.debug(f"{len(changes)} file change(s): {list(changes)[:5]}")
+        
         # Analyze impact
-        impact = await self.analyzer.analyze_file_change(
-            file_path=path,
-            event_type=event_type,
+        impact = await self.analyzer.analyze_file_changes(
+            changes=changes,
             context=self.context_cache,
         )
         
         if impact.get("severity") == "high":
-            logger.warning(f"⚠️  High impact change detected in {path}")
+            files = list(changes)
+            logger.warning(f"⚠️  High impact change detected in {', '.join(files[:5])}")
             
             # Execute configured workflow
             workflow = self.config.get("workflows", {}).get("on_file_change", [])
             for action in workflow:
-                await self._execute_workflow_action(action, {"file": path, "impact": impact})
+                await self._execute_workflow_action(action, {"files": files, "impact": impact})
 
-    def _should_ignore(self, path: str) -> bool:
-        """Check if file should be ignored."""
-        ignore_patterns = self.config.get("agent", {}).get("ignore_patterns", [
+    def _get_ignore_patterns(self) -> List[str]:
+        """Glob patterns for files the agent does not react to."""
+        return self.config.get("agent", {}).get("ignore_patterns", [
             "node_modules/**",
             ".git/**",
             "__pycache__/**",
             "*.pyc",
             ".iacore/runtime/**",
         ])
+
+    @staticmethod
+    def _compile_ignore_patterns(patterns: List[str]) -> Optional[re.Pattern]:
+        """Combine glob patterns into one regex anchored at a path segment."""
+        if not patterns:
+            return None
         
-        from pathlib import Path
-        path_obj = Path(path)
+        combined = "|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns)
+        return re.compile(f"(?:^|/)(?:{combined})")
+
+    def _should_ignore(self, path: str) -> bool:
+        """Check if file should be ignored."""
+        if self._ignore_re is None:
+            return False
         
-        for pattern in ignore_patterns:
-            if path_obj.match(pattern):
-                return True
+        if os.sep != "/":
+            path = path.replace(os.sep, "/")
         
-        return False
+        return self._ignore_re.search(path) is not None
 
     async def _execute_workflow_action(self, action: str, data: Dict):
         """Execute a workflow action."""
@@ -358,7 +651,13 @@ ALTERNATIVE:"""
 
     async def _action_analyze_commit(self, data: Dict):
         """Action: Analyze git commit."""
-        # Get last commit info
+        # Get last commit info, in-process when pygit2 is installed
+        if self._repo is not None:
+            commit_info = self._last_commit_info()
+            if commit_info:
+                logger.info(f"📝 Last commit: {commit_info}")
+            return
+        
         result = await self.executor.execute("git log -1 --pretty=format:'%H %s'", silent=True)
         if result["success"]:
             commit_info = result["output"]
@@ -368,7 +667,7 @@ ALTERNATIVE:"""
         """Action: Suggest improvements via LLM."""
         prompt = f"""Analyze this code change and suggest improvements:
 
-File: {data.get('file')}
+Files: {', '.join(data.get('files', [])[:20])}
 Impact: {json.dumps(data.get('impact', {}))}
 
 Provide 3 concrete suggestions for improvement.
@@ -379,28 +678,45 @@ SUGGESTIONS:"""
 
 
 class ProjectFileHandler(FileSystemEventHandler):
-    """Handler for file system events."""
+    """
+    Handler for file system events.
+    
+    Runs on the watchdog thread, so events are handed to the agent's
+    event loop instead of being processed here.
+    """
 
-    def __init__(self, agent: AutonomousAgent):
+    def __init__(self, agent: AutonomousAgent, loop: asyncio.AbstractEventLoop):
         self.agent = agent
+        self.loop = loop
+
+    def dispatch(self, event: FileSystemEvent):
+        # Drop ignored paths before any per-event work. This is the filter
+        # PatternMatchingEventHandler would apply, but with the agent's
+        # compiled patterns, which also match below nested directories.
+        if self.agent._should_ignore(event.src_path):
+            return
+        super().dispatch(event)
+
+    def _enqueue(self, path: str, event_type: str):
+        self.loop.call_soon_threadsafe(
+            self.agent._event_queue.put_nowait, (path, event_type)
+        )
 
     def on_modified(self, event: FileSystemEvent):
         if not event.is_directory:
-            asyncio.create_task(
-                self.agent.on_file_change(event.src_path, "modified")
-            )
+            self._enqueue(event.src_path, "modified")
 
     def on_created(self, event: FileSystemEvent):
-        if not event.is_directory:
-            asyncio.create_task(
-                self.agent.on_file_change(event.src_path, "created")
-            )
+        if event.is_directory:
+            # New top-level directories need their own recursive watch
+            if Path(event.src_path).parent == self.agent.project_root:
+                self.agent._watch_directory(event.src_path)
+        else:
+            self._enqueue(event.src_path, "created")
 
     def on_deleted(self, event: FileSystemEvent):
         if not event.is_directory:
-            asyncio.create_task(
-                self.agent.on_file_change(event.src_path, "deleted")
-            )
+            self._enqueue(event.src_path, "deleted")
 
 
 # CLI entry point
@@ -428,4 +744,10 @@ async def main():
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     asyncio.run(main())
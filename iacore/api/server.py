@@ -72,28 +72,22 @@ async def get_status():
 @app.post("/tasks", response_model=TaskResponse)
 async def create_task(task: TaskRequest):
     """Create a new task for the agent."""
+    if not agent_instance:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
     import uuid
     
     task_id = str(uuid.uuid4())[:8]
     
     # Save task to queue
-    tasks_file = Path(agent_instance.project_root) / ".iacore" / "runtime" / "tasks.json"
-    tasks_file.parent.mkdir(parents=True, exist_ok=True)
-    
-    import json
-    tasks = []
-    if tasks_file.exists():
-        tasks = json.loads(tasks_file.read_text())
-    
-    tasks.append({
+    await agent_instance.task_store.add({
         "id": task_id,
         "description": task.description,
         "status": "pending",
         "auto_execute": task.auto_execute,
         "created_at": str(asyncio.get_event_loop().time()),
     })
-    
-    tasks_file.write_text(json.dumps(tasks, indent=2))
+    agent_instance.notify_new_task()
     
     logger.info(f"Task created: {task_id}")
     
@@ -103,15 +97,10 @@ async def create_task(task: TaskRequest):
 @app.get("/tasks/{task_id}")
 async def get_task(task_id: str):
     """Get task status."""
-    tasks_file = Path(agent_instance.project_root) / ".iacore" / "runtime" / "tasks.json"
-    
-    if not tasks_file.exists():
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    import json
-    tasks = json.loads(tasks_file.read_text())
+    if not agent_instance:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    task = next((t for t in tasks if t["id"] == task_id), None)
+    task = await agent_instance.task_store.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -138,6 +127,21 @@ async def trigger_analysis():
     return {"status": "completed", "timestamp": agent_instance.last_analysis.isoformat()}
 
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get LLM response cache statistics."""
+    if not agent_instance:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    stats = agent_instance.llm_cache.stats
+    total = stats["hits"] + stats["misses"]
+    
+    return {
+        **stats,
+        "hit_rate": stats["hits"] / total if total else 0.0,
+    }
+
+
 @app.post("/agent/pause")
 async def pause_agent():
     """Pause the agent."""
@@ -197,6 +201,7 @@ def main():
     parser = argparse.ArgumentParser(description="IA_Core API Server")
     parser.add_argument("--host", default="127.0.0.1", help="Host to bind")
     parser.add_argument("--port", type=int, default=8788, help="Port to bind")
+    parser.add_argument("--uds", help="Serve on this Unix domain socket instead of TCP")
     parser.add_argument("--project-root", required=True, help="Project root directory")
     parser.add_argument("--config", help="Config file path")
     args = parser.parse_args()
@@ -207,12 +212,22 @@ def main():
     if args.config:
         os.environ["IA_CORE_CONFIG"] = args.config
     
+    # Prefer uvloop/httptools (uvicorn[standard]); the API only serves local clients,
+    # so per-request access logging is disabled
+    import importlib.util
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    
     # Run server
     uvicorn.run(
         app,
         host=args.host,
         port=args.port,
-        log_level="info",
+        uds=args.uds,
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+        access_log=False,
+        log_level="warning",
     )
 
 
@@ -12,32 +12,47 @@ Commands:
 """
 
 import json
+import os
 import sys
 from pathlib import Path
 from typing import Optional
 
-import requests
 import typer
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
 
 app = typer.Typer(help="IA_Core - Autonomous AI Orchestration")
 console = Console()
 
 # Configuration
 API_URL = "http://127.0.0.1:8788"
+API_SOCKET = os.getenv("IACORE_API_SOCKET")  # Unix socket, if the API serves one
 HOME_DIR = Path.home() / ".iacore"
 
+_client = None
+
+
+def get_client():
+    """Shared HTTP client for the local API (keeps the connection open)."""
+    global _client
+    if _client is None:
+        import httpx
+        
+        transport = httpx.HTTPTransport(uds=API_SOCKET) if API_SOCKET else None
+        _client = httpx.Client(base_url=API_URL, transport=transport, timeout=10.0)
+    return _client
+
 
 @app.command()
 def status():
     """Show agent and system status."""
+    import httpx
+    from rich.table import Table
+    
     console.print("\n[bold cyan]IA_Core Status[/bold cyan]\n")
     
     # Check if agent is running
     try:
-        r = requests.get(f"{API_URL}/status", timeout=2)
+        r = get_client().get("/status", timeout=2)
         data = r.json()
         
         # Create status table
@@ -53,7 +68,7 @@ def status():
         
         console.print(table)
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         console.print("[red]❌ Agent not running[/red]")
         console.print("\n[yellow]Start the agent with:[/yellow]")
         console.print("  cd your-project && iacore start")
@@ -73,23 +88,59 @@ def logs(
         console.print("[yellow]No logs found[/yellow]")
         return
     
+    # Show last N lines
+    for line in _tail_lines(log_file, lines):
+        console.print(line)
+    
     if follow:
-        # Follow logs (tail -f)
-        import subprocess
-        subprocess.run(["tail", "-f", str(log_file)])
-    else:
-        # Show last N lines
-        with open(log_file) as f:
-            all_lines = f.readlines()
-            for line in all_lines[-lines:]:
-                console.print(line.rstrip())
+        import asyncio
+        try:
+            asyncio.run(_follow_log(log_file))
+        except KeyboardInterrupt:
+            pass
+
+
+def _tail_lines(path: Path, count: int, block_size: int = 8192) -> list:
+    """Read the last `count` lines of a file without loading all of it."""
+    if count <= 0:
+        return []
+    
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        # Read backwards until enough line breaks were seen
+        while pos > 0 and data.count(b"\n") <= count:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    
+    return data.decode(errors="replace").splitlines()[-count:]
+
+
+async def _follow_log(path: Path):
+    """Stream lines appended to the log file (tail -f)."""
+    import asyncio
+    
+    proc = await asyncio.create_subprocess_exec(
+        "tail", "-n", "0", "-f", str(path),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        async for line in proc.stdout:
+            console.print(line.decode(errors="replace").rstrip())
+    finally:
+        if proc.returncode is None:
+            proc.terminate()
+            await proc.wait()
 
 
 @app.command()
 def pause():
     """Pause the agent."""
     try:
-        r = requests.post(f"{API_URL}/agent/pause")
+        r = get_client().post("/agent/pause")
         console.print("[yellow]⏸️  Agent paused[/yellow]")
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
@@ -99,7 +150,7 @@ def pause():
 def resume():
     """Resume the agent."""
     try:
-        r = requests.post(f"{API_URL}/agent/resume")
+        r = get_client().post("/agent/resume")
         console.print("[green]▶️  Agent resumed[/green]")
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
@@ -131,7 +182,8 @@ def analyze():
     console.print("[cyan]Analyzing project...[/cyan]")
     
     try:
-        r = requests.post(f"{API_URL}/analyze")
+        # Analysis waits on the LLM, so no client timeout here
+        r = get_client().post("/analyze", timeout=None)
         data = r.json()
         console.print(f"[green]✓ Analysis complete[/green]")
         console.print(f"Timestamp: {data['timestamp']}")
@@ -147,7 +199,7 @@ def uninstall():
     
     # Stop agent
     try:
-        requests.post(f"{API_URL}/agent/pause")
+        get_client().post("/agent/pause")
     except:
         pass
     
@@ -178,5 +230,4 @@ def version():
 
 
 if __name__ == "__main__":
-    import os
     app()
@@ -5,19 +5,62 @@ Intelligent Analyzer - Uses LLM to understand project context.
 import asyncio
 import logging
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
+import orjson
+
+from .llm_cache import LLMCache
 from .llm_client import LLMClient
 from .detector import ProjectDetector
 
 logger = logging.getLogger(__name__)
 
+# Responses larger than this are parsed in a worker thread
+THREAD_PARSE_THRESHOLD = 8192
+
 
 class IntelligentAnalyzer:
     """Analyzes projects using LLM intelligence."""
 
-    def __init__(self, llm_model: str = "gpt-4o-mini"):
-        self.llm = LLMClient(model=llm_model)
+    def __init__(
+        self,
+        llm_model: str = "gpt-4o-mini",
+        cache: Optional[LLMCache] = None,
+        llm: Optional[LLMClient] = None,
+    ):
+        self.llm = llm or LLMClient(model=llm_model, cache=cache)
+        # (project_root, max_depth) -> (walked dirs, their mtimes, file tree)
+        self._tree_cache: Dict[Tuple[Path, int], Tuple[List[Path], tuple, List[str]]] = {}
+
+    def _get_file_tree(self, project_root: Path, max_depth: int) -> List[str]:
+        """File tree of the project, reused while no walked directory changed."""
+        detector = ProjectDetector(project_root)
+        cache_key = (detector.project_root, max_depth)
+        
+        cached = self._tree_cache.get(cache_key)
+        if cached:
+            dirs, mtimes, file_tree = cached
+            if detector.dirs_fingerprint(dirs) == mtimes:
+                return file_tree
+        
+        dirs: List[Path] = []
+        file_tree = detector.get_file_tree(max_depth=max_depth, visited_dirs=dirs)
+        self._tree_cache[cache_key] = (dirs, detector.dirs_fingerprint(dirs), file_tree)
+        return file_tree
+
+    @staticmethod
+    async def _parse_json(response: str, default: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a JSON-mode LLM response, falling back to default."""
+        try:
+            if len(response) > THREAD_PARSE_THRESHOLD:
+                parsed = await asyncio.to_thread(orjson.loads, response)
+            else:
+                parsed = orjson.loads(response)
+        except orjson.JSONDecodeError:
+            logger.warning("LLM response is not valid JSON, using defaults")
+            return default
+        
+        return parsed if isinstance(parsed, dict) else default
 
     async def analyze_project(
         self,
@@ -29,8 +72,8 @@ class IntelligentAnalyzer:
         
         Returns insights, suggestions, and action items.
         """
-        detector = ProjectDetector(project_root)
-        file_tree = detector.get_file_tree(max_depth=2)
+        # Walking the tree is blocking I/O; keep the event loop free
+        file_tree = await asyncio.to_thread(self._get_file_tree, project_root, 2)
         
         prompt = f"""Analyze this {project_type} project:
 
@@ -47,23 +90,14 @@ Provide analysis in JSON format:
 
 JSON:"""
         
-        response = await self.llm.complete(prompt, max_tokens=400, temperature=0.5)
+        response = await self.llm.complete(prompt, max_tokens=400, temperature=0, json_mode=True)
         
-        try:
-            import json
-            json_start = response.find("{")
-            json_end = response.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                return json.loads(response[json_start:json_end])
-        except Exception as e:
-            logger.error(f"Failed to parse LLM response: {e}")
-        
-        return {
+        return await self._parse_json(response, {
             "insights": [],
             "suggestions": [],
             "priorities": [],
             "risks": [],
-        }
+        })
 
     async def analyze_file_change(
         self,
@@ -86,19 +120,48 @@ Assess the impact (JSON):
 
 JSON:"""
         
-        response = await self.llm.complete(prompt, max_tokens=200, temperature=0.3)
+        response = await self.llm.complete(prompt, max_tokens=200, temperature=0, json_mode=True)
         
-        try:
-            import json
-            json_start = response.find("{")
-            json_end = response.rfind("}") + 1
-            if json_start >= 0:
-                return json.loads(response[json_start:json_end])
-        except:
-            pass
+        return await self._parse_json(response, {
+            "severity": "low",
+            "affected_components": [],
+            "required_actions": [],
+        })
+
+    async def analyze_file_changes(
+        self,
+        changes: Dict[str, str],
+        context: Dict,
+    ) -> Dict[str, Any]:
+        """Analyze the combined impact of a batch of file changes."""
+        if len(changes) == 1:
+            file_path, event_type = next(iter(changes.items()))
+            return await self.analyze_file_change(file_path, event_type, context)
+        
+        listed = list(changes.items())[:50]
+        lines = [f"- {event_type}: {file_path}" for file_path, event_type in listed]
+        if len(changes) > len(listed):
+            lines.append(f"- ... and {len(changes) - len(listed)} more")
+        
+        prompt = f"""{len(changes)} files changed:
+
+{chr(10).join(lines)}
+
+Project: {context.get('project_type', 'unknown')}
+
+Assess the overall impact (JSON):
+{{
+  "severity": "low|medium|high",
+  "affected_components": [...],
+  "required_actions": [...]
+}}
+
+JSON:"""
+        
+        response = await self.llm.complete(prompt, max_tokens=300, temperature=0, json_mode=True)
         
-        return {
+        return await self._parse_json(response, {
             "severity": "low",
             "affected_components": [],
             "required_actions": [],
-        }
+        })
@@ -5,12 +5,33 @@ Reuses the AutoDetector from ai-workforce but simplified for IA_Core.
 """
 
 import json
+import mmap
+import os
+import re
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Files whose presence or content decides the detected project type
+MANIFEST_FILES = [
+    "package.json",
+    "requirements.txt",
+    "setup.py",
+    "pyproject.toml",
+    "manage.py",
+    "main.py",
+    "go.mod",
+    "Cargo.toml",
+]
+
+_FASTAPI_RE = re.compile(rb"fastapi", re.IGNORECASE)
+
+# Directory names never included in the file tree
+IGNORED_DIRS = {"node_modules", "__pycache__", "venv", "env"}
+
 
 class ProjectDetector:
     """Detects project type and structure."""
@@ -35,8 +56,11 @@ class ProjectDetector:
         files = []
         dependencies = {}
 
+        # One directory listing instead of a stat per candidate file
+        names = self._scan(self.project_root)
+
         # Check for package.json (Node/React/Vue/etc)
-        if (self.project_root / "package.json").exists():
+        if "package.json" in names:
             pkg_json = json.loads((self.project_root / "package.json").read_text())
             dependencies = pkg_json.get("dependencies", {})
             
@@ -59,50 +83,43 @@ class ProjectDetector:
             files.append("package.json")
 
         # Check for Python
-        elif (self.project_root / "requirements.txt").exists() or \
-             (self.project_root / "setup.py").exists() or \
-             (self.project_root / "pyproject.toml").exists():
-            
+        elif "requirements.txt" in names or "setup.py" in names or "pyproject.toml" in names:
             project_type = "python"
             confidence = 0.8
             
             # Check for specific frameworks
-            if (self.project_root / "manage.py").exists():
+            if "manage.py" in names:
                 project_type = "django"
                 confidence = 0.95
-            elif any((self.project_root / "app").glob("*.py")) or \
-                 any((self.project_root / "main.py").exists() for _ in [1]):
+            elif "main.py" in names or self._has_app_modules(names):
                 # Check if FastAPI
-                try:
-                    req_file = self.project_root / "requirements.txt"
-                    if req_file.exists() and "fastapi" in req_file.read_text().lower():
-                        project_type = "fastapi"
-                        confidence = 0.9
-                except:
-                    pass
+                if "requirements.txt" in names and \
+                   self._file_contains(names["requirements.txt"].path, _FASTAPI_RE):
+                    project_type = "fastapi"
+                    confidence = 0.9
             
             files.extend([
                 f for f in ["requirements.txt", "setup.py", "pyproject.toml"]
-                if (self.project_root / f).exists()
+                if f in names
             ])
 
         # Check for Go
-        elif (self.project_root / "go.mod").exists():
+        elif "go.mod" in names:
             project_type = "go"
             confidence = 0.9
             files.append("go.mod")
 
         # Check for Rust
-        elif (self.project_root / "Cargo.toml").exists():
+        elif "Cargo.toml" in names:
             project_type = "rust"
             confidence = 0.9
             files.append("Cargo.toml")
 
         # Check for HTML/Static
-        elif list(self.project_root.glob("*.html")):
+        elif any(name.endswith(".html") for name in names):
             project_type = "html_static"
             confidence = 0.6
-            files.extend([str(f.name) for f in self.project_root.glob("*.html")][:5])
+            files.extend([name for name in names if name.endswith(".html")][:5])
 
         return {
             "type": project_type,
@@ -112,28 +129,95 @@ class ProjectDetector:
             "root": str(self.project_root),
         }
 
-    def get_file_tree(self, max_depth: int = 3) -> List[str]:
-        """Get file tree of project."""
+    @staticmethod
+    def _scan(path: Path) -> Dict[str, os.DirEntry]:
+        """Entries of a directory by name; empty if it cannot be listed."""
+        try:
+            with os.scandir(path) as it:
+                return {entry.name: entry for entry in it}
+        except OSError:
+            return {}
+
+    @staticmethod
+    def _file_contains(path: str, pattern: "re.Pattern[bytes]") -> bool:
+        """Search a file through mmap, without reading or lower-casing a copy."""
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return False
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return pattern.search(mapped) is not None
+        except (OSError, ValueError):
+            return False
+
+    def _has_app_modules(self, names: Dict[str, os.DirEntry]) -> bool:
+        """Whether app/ exists and contains Python modules."""
+        app_dir = names.get("app")
+        if app_dir is None or not app_dir.is_dir():
+            return False
+        return any(name.endswith(".py") for name in self._scan(app_dir.path))
+
+    def fingerprint(self) -> Tuple[Optional[int], ...]:
+        """
+        Cheap change key for detect().
+        
+        Modification times of the project root, app/ and the manifest
+        files; any file added or removed at the top level bumps the root.
+        """
+        paths = [self.project_root, self.project_root / "app"]
+        paths += [self.project_root / name for name in MANIFEST_FILES]
+        return self.dirs_fingerprint(paths)
+
+    @staticmethod
+    def dirs_fingerprint(paths: List[Path]) -> Tuple[Optional[int], ...]:
+        """Modification times (ns) of paths; None for missing ones."""
+        mtimes = []
+        for path in paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def get_file_tree(
+        self,
+        max_depth: int = 3,
+        visited_dirs: Optional[List[Path]] = None,
+    ) -> List[str]:
+        """
+        Get file tree of project.
+        
+        Args:
+            max_depth: Maximum directory depth to descend
+            visited_dirs: If given, every directory listed is appended to it
+        """
         files = []
+        limit = 100  # Limit to 100 files
         
-        def walk(path: Path, depth: int = 0):
-            if depth > max_depth:
-                return
+        # Breadth-first, so the limit keeps the shallowest entries
+        pending = deque([(self.project_root, 0)])
+        while pending and len(files) < limit:
+            path, depth = pending.popleft()
+            
+            if visited_dirs is not None:
+                visited_dirs.append(path)
             
             try:
-                for item in path.iterdir():
-                    # Skip hidden and common ignore patterns
-                    if item.name.startswith(".") or \
-                       item.name in ["node_modules", "__pycache__", "venv", "env"]:
-                        continue
-                    
-                    rel_path = item.relative_to(self.project_root)
-                    files.append(str(rel_path))
-                    
-                    if item.is_dir():
-                        walk(item, depth + 1)
-            except PermissionError:
-                pass
+                with os.scandir(path) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            
+            for entry in entries:
+                # Skip hidden and common ignore patterns
+                if entry.name.startswith(".") or entry.name in IGNORED_DIRS:
+                    continue
+                
+                files.append(os.path.relpath(entry.path, self.project_root))
+                if len(files) >= limit:
+                    break
+                
+                if depth < max_depth and entry.is_dir(follow_symlinks=False):
+                    pending.append((Path(entry.path), depth + 1))
         
-        walk(self.project_root)
-        return sorted(files)[:100]  # Limit to 100 files
+        return sorted(files)
@@ -0,0 +1,300 @@
+"""
+LLM Cache - Response cache for LLM completions.
+
+Supports:
+- In-memory backend (per process)
+- SQLite backend (single database file, default)
+- File backend (one JSON file per prompt)
+- Redis backend (optional, shared between processes)
+"""
+
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Protocol
+
+import orjson
+
+try:
+    from blake3 import blake3 as _hasher
+except ImportError:
+    from hashlib import sha256 as _hasher
+
+logger = logging.getLogger(__name__)
+
+# Prompts are hashed in slices of this many characters
+_HASH_CHUNK_CHARS = 64 * 1024
+
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        ...
+
+
+class MemoryCacheBackend:
+    """Keeps cache entries in a process-local dict."""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+
+
+class FileCacheBackend:
+    """Stores each cache entry as a JSON file under cache_dir."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        cache_file = self.cache_dir / f"{key}.json"
+        if not cache_file.exists():
+            return None
+
+        try:
+            return orjson.loads(cache_file.read_bytes())
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable cache entry {cache_file}: {e}")
+            return None
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        cache_file = self.cache_dir / f"{key}.json"
+        cache_file.write_bytes(orjson.dumps(entry))
+
+
+class SQLiteCacheBackend:
+    """
+    Stores cache entries in a single SQLite database.
+    
+    Once the table holds more than max_entries rows, the oldest
+    entries are evicted (checked every `evict_every` writes).
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        model TEXT,
+        prompt TEXT,
+        response TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_llm_cache_timestamp ON llm_cache (timestamp);
+    """
+
+    def __init__(self, path: Path, max_entries: int = 10000, evict_every: int = 100):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        
+        self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self._SCHEMA)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT timestamp, model, prompt, response FROM llm_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        
+        if row is None:
+            return None
+        return {"timestamp": row[0], "model": row[1], "prompt": row[2], "response": row[3]}
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, timestamp, model, prompt, response) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, entry["timestamp"], entry.get("model"), entry.get("prompt"), entry["response"]),
+            )
+            
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self):
+        """Delete the oldest entries beyond max_entries."""
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY timestamp DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class RedisCacheBackend:
+    """Stores cache entries in Redis (requires the redis package)."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "iacore:llm:"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._redis.get(self.prefix + key)
+        return orjson.loads(raw) if raw else None
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self._redis.set(self.prefix + key, orjson.dumps(entry))
+
+
+def create_cache_backend(name: str = "sqlite", **options) -> CacheBackend:
+    """
+    Create a cache backend by name.
+
+    Args:
+        name: "memory", "sqlite", "file" or "redis"
+        options: Backend specific options (cache_dir, max_entries, url)
+    """
+    cache_dir = Path(options.get("cache_dir") or Path.home() / ".iacore" / "llm_cache")
+    
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "sqlite":
+        return SQLiteCacheBackend(
+            cache_dir / "cache.sqlite",
+            max_entries=options.get("max_entries", 10000),
+        )
+    if name == "file":
+        return FileCacheBackend(cache_dir)
+    if name == "redis":
+        return RedisCacheBackend(url=options.get("url", "redis://localhost:6379/0"))
+
+    raise ValueError(f"Unsupported cache backend: {name}")
+
+
+class LLMCache:
+    """
+    Exact-match cache for LLM completions.
+
+    Entries are keyed by (model, prompt, temperature, max_tokens, json_mode),
+    so the same prompt sent with different sampling settings or response
+    format is cached separately.
+    The most recently used entries are also kept in memory in front of
+    the backend.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        ttl_seconds: int = 24 * 3600,
+        memory_entries: int = 512,
+    ):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._recent: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool = False,
+    ) -> str:
+        """Build the cache key for a completion request."""
+        hasher = _hasher(
+            orjson.dumps(
+                {
+                    "model": model,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "json_mode": json_mode,
+                },
+                option=orjson.OPT_SORT_KEYS,
+            )
+            + b"\0"
+        )
+        # Encode long prompts piecewise instead of as one large buffer
+        for start in range(0, len(prompt), _HASH_CHUNK_CHARS):
+            hasher.update(prompt[start:start + _HASH_CHUNK_CHARS].encode())
+        return hasher.hexdigest()
+
+    def get(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool = False,
+    ) -> Optional[str]:
+        """Return the cached response, or None on miss or expiry."""
+        key = self.make_key(model, prompt, temperature, max_tokens, json_mode)
+
+        entry = self._recent.get(key)
+        if entry is not None:
+            self._recent.move_to_end(key)
+        else:
+            try:
+                entry = self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"LLM cache lookup failed: {e}")
+                entry = None
+            
+            if entry:
+                self._remember(key, entry)
+
+        if entry:
+            cached_at = datetime.fromisoformat(entry["timestamp"])
+            if datetime.now() - cached_at < timedelta(seconds=self.ttl_seconds):
+                self.stats["hits"] += 1
+                return entry["response"]
+            self._recent.pop(key, None)
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        response: str,
+        json_mode: bool = False,
+    ):
+        """Store a response for a completion request."""
+        key = self.make_key(model, prompt, temperature, max_tokens, json_mode)
+        entry = {
+            "prompt": prompt[:200],  # Store truncated prompt
+            "response": response,
+            "timestamp": datetime.now().isoformat(),
+            "model": model,
+        }
+
+        self._remember(key, entry)
+
+        try:
+            self.backend.set(key, entry)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        """Keep an entry in the in-memory LRU, evicting the oldest."""
+        if self.memory_entries <= 0:
+            return
+        
+        self._recent[key] = entry
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.memory_entries:
+            self._recent.popitem(last=False)
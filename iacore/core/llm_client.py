@@ -9,13 +9,16 @@ Supports:
 """
 
 import asyncio
-import hashlib
-import json
 import logging
 import os
+import time
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from typing import Deque, Dict, Optional, Any
+
+import orjson
+
+from .llm_cache import LLMCache, SQLiteCacheBackend
 
 logger = logging.getLogger(__name__)
 
@@ -33,26 +36,57 @@ class LLMClient:
         provider: str = "openai",
         api_key: Optional[str] = None,
         cache_dir: Optional[Path] = None,
+        cache: Optional[LLMCache] = None,
     ):
         self.model = model
         self.provider = provider
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.cache_dir = cache_dir or Path.home() / ".iacore" / "llm_cache"
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = cache or LLMCache(backend=SQLiteCacheBackend(self.cache_dir / "cache.sqlite"))
         
         # Rate limiting (free tier: 10 req/min)
         self.rate_limit = 10
         self.rate_window = 60  # seconds
-        self.request_times: List[datetime] = []
+        self.request_times: Deque[float] = deque()  # time.monotonic() per request
+        
+        # Tokenizer for prompt budgeting (loaded on first use)
+        self._encoding: Any = None
+        
+        # Async OpenAI client, one connection pool for all requests (created on first use)
+        self._client: Any = None
+        
+        # Requests currently waiting on the API, by cache key
+        self._inflight: Dict[str, asyncio.Task] = {}
         
         logger.info(f"LLMClient initialized: {provider}/{model}")
 
+    def count_tokens(self, text: str) -> int:
+        """
+        Count prompt tokens for the configured model.
+        
+        Uses tiktoken when installed, otherwise estimates ~4 chars/token.
+        """
+        if self._encoding is None:
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+            except ImportError:
+                self._encoding = False
+        
+        if self._encoding:
+            return len(self._encoding.encode(text))
+        return len(text) // 4 + 1
+
     async def complete(
         self,
         prompt: str,
         max_tokens: int = 500,
         temperature: float = 0.7,
         use_cache: bool = True,
+        json_mode: bool = False,
     ) -> str:
         """
         Generate completion from LLM.
@@ -62,30 +96,60 @@ class LLMClient:
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
             use_cache: Whether to use cached responses
+            json_mode: Ask the provider for a JSON object response
             
         Returns:
             Generated text
         """
+        if not use_cache:
+            return await self._generate(prompt, max_tokens, temperature, False, json_mode)
+        
         # Check cache
-        if use_cache:
-            cached = self._get_cached(prompt)
-            if cached:
-                logger.debug("Using cached response")
-                return cached
+        cached = self.cache.get(self.model, prompt, temperature, max_tokens, json_mode)
+        if cached:
+            logger.debug("Using cached response")
+            return cached
         
+        # Identical requests already in flight share a single API call
+        key = LLMCache.make_key(self.model, prompt, temperature, max_tokens, json_mode)
+        task = self._inflight.get(key)
+        if task:
+            logger.debug("Joining in-flight request")
+            return await asyncio.shield(task)
+        
+        task = asyncio.create_task(
+            self._generate(prompt, max_tokens, temperature, True, json_mode)
+        )
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shielded so a cancelled caller does not cancel the others' request
+        return await asyncio.shield(task)
+
+    async def _generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        use_cache: bool,
+        json_mode: bool = False,
+    ) -> str:
+        """Call the provider (rate limited) and cache the response."""
         # Rate limiting
         await self._check_rate_limit()
         
         # Generate completion
         try:
             if self.provider == "openai":
-                response = await self._openai_complete(prompt, max_tokens, temperature)
+                response = await self._openai_complete(prompt, max_tokens, temperature, json_mode)
             else:
                 raise ValueError(f"Unsupported provider: {self.provider}")
             
             # Cache response
-            if use_cache:
-                self._cache_response(prompt, response)
+            if use_cache and response:
+                self.cache.set(
+                    self.model, prompt, temperature, max_tokens, response, json_mode
+                )
             
             return response
             
@@ -98,6 +162,7 @@ class LLMClient:
         prompt: str,
         max_tokens: int,
         temperature: float,
+        json_mode: bool = False,
     ) -> str:
         """Complete using OpenAI API."""
         try:
@@ -106,83 +171,61 @@ class LLMClient:
             logger.error("openai package not installed. Run: pip install openai")
             return ""
         
-        # Set API key
-        openai.api_key = self.api_key
+        if self._client is None:
+            try:
+                self._client = openai.AsyncOpenAI(api_key=self.api_key)
+            except openai.OpenAIError:
+                logger.error("Invalid API key. Set OPENAI_API_KEY environment variable.")
+                return ""
+        
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
         
         try:
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
+            response = await self._client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=max_tokens,
                 temperature=temperature,
+                **extra,
             )
             
-            return response.choices[0].message.content
+            return response.choices[0].message.content or ""
             
-        except openai.error.RateLimitError:
+        except openai.RateLimitError:
             logger.warning("Rate limit exceeded, waiting...")
             await asyncio.sleep(60)
-            return await self._openai_complete(prompt, max_tokens, temperature)
+            return await self._openai_complete(prompt, max_tokens, temperature, json_mode)
         
-        except openai.error.AuthenticationError:
+        except openai.AuthenticationError:
             logger.error("Invalid API key. Set OPENAI_API_KEY environment variable.")
             return ""
 
+    async def close(self):
+        """Close the underlying HTTP connection pool."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
     async def _check_rate_limit(self):
         """Check and enforce rate limiting."""
-        now = datetime.now()
-        
-        # Remove old requests outside window
-        self.request_times = [
-            t for t in self.request_times
-            if now - t < timedelta(seconds=self.rate_window)
-        ]
-        
-        # Check if at limit
-        if len(self.request_times) >= self.rate_limit:
-            oldest = self.request_times[0]
-            wait_time = (oldest + timedelta(seconds=self.rate_window) - now).total_seconds()
+        while True:
+            now = time.monotonic()
             
-            if wait_time > 0:
-                logger.warning(f"Rate limit reached, waiting {wait_time:.1f}s...")
-                await asyncio.sleep(wait_time)
+            # Remove old requests outside window
+            while self.request_times and now - self.request_times[0] >= self.rate_window:
+                self.request_times.popleft()
+            
+            if len(self.request_times) < self.rate_limit:
+                break
+            
+            # At limit: wait until the oldest request leaves the window
+            wait_time = self.request_times[0] + self.rate_window - now
+            logger.warning(f"Rate limit reached, waiting {wait_time:.1f}s...")
+            await asyncio.sleep(wait_time)
         
         # Record this request
         self.request_times.append(now)
 
-    def _get_cached(self, prompt: str) -> Optional[str]:
-        """Get cached response for prompt."""
-        cache_key = hashlib.md5(prompt.encode()).hexdigest()
-        cache_file = self.cache_dir / f"{cache_key}.json"
-        
-        if cache_file.exists():
-            try:
-                data = json.loads(cache_file.read_text())
-                
-                # Check if cache is recent (24 hours)
-                cached_at = datetime.fromisoformat(data["timestamp"])
-                if datetime.now() - cached_at < timedelta(hours=24):
-                    return data["response"]
-            except:
-                pass
-        
-        return None
-
-    def _cache_response(self, prompt: str, response: str):
-        """Cache LLM response."""
-        cache_key = hashlib.md5(prompt.encode()).hexdigest()
-        cache_file = self.cache_dir / f"{cache_key}.json"
-        
-        data = {
-            "prompt": prompt[:200],  # Store truncated prompt
-            "response": response,
-            "timestamp": datetime.now().isoformat(),
-            "model": self.model,
-        }
-        
-        cache_file.write_text(json.dumps(data, indent=2))
-
     def _fallback_response(self, prompt: str) -> str:
         """Fallback response when LLM fails."""
         logger.warning("Using fallback response")
@@ -209,15 +252,13 @@ Provide a JSON response with:
 
 JSON:"""
         
-        response = await self.complete(prompt, max_tokens=300, temperature=0.3)
+        response = await self.complete(prompt, max_tokens=300, temperature=0, json_mode=True)
         
         try:
-            # Extract JSON from response
-            json_start = response.find("{")
-            json_end = response.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                return json.loads(response[json_start:json_end])
-        except:
+            parsed = orjson.loads(response)
+            if isinstance(parsed, dict):
+                return parsed
+        except orjson.JSONDecodeError:
             pass
         
         return {
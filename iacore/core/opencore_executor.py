@@ -6,13 +6,62 @@ Provides isolated, sandboxed execution without showing output to user.
 
 import asyncio
 import logging
+import os
+import re
 import shlex
+import shutil
+import signal
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Deque, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Blacklist dangerous commands (matched case-insensitively)
+DANGEROUS_PATTERNS = [
+    "rm -rf /",
+    "dd if=",
+    "mkfs",
+    ":(){ :|:& };:",  # Fork bomb
+    "curl | sh",
+    "wget | sh",
+]
+
+_DANGEROUS_RE = re.compile(
+    "|".join(re.escape(pattern) for pattern in DANGEROUS_PATTERNS),
+    re.IGNORECASE,
+)
+
+
+class _BoundedBuffer:
+    """Collects a stream, dropping the oldest chunks beyond a size limit."""
+
+    def __init__(self, limit: int, chunk_size: int = 65536):
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.chunks: Deque[bytes] = deque()
+        self.size = 0
+        self.truncated = False
+
+    async def drain(self, stream: Optional[asyncio.StreamReader]):
+        if stream is None:
+            return
+        
+        while True:
+            chunk = await stream.read(self.chunk_size)
+            if not chunk:
+                return
+            
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+            while self.size > self.limit and len(self.chunks) > 1:
+                self.size -= len(self.chunks.popleft())
+                self.truncated = True
+
+    def text(self) -> str:
+        return b"".join(self.chunks).decode("utf-8", errors="ignore")
+
 
 class OpenCoreExecutor:
     """
@@ -26,10 +75,13 @@ class OpenCoreExecutor:
         project_root: Path | str,
         silent_mode: bool = True,
         timeout: int = 300,
+        max_output_bytes: int = 16 * 1024 * 1024,
     ):
         self.project_root = Path(project_root).resolve()
         self.silent_mode = silent_mode
         self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self._opencore_cached: Optional[bool] = None
         
         logger.info(f"OpenCoreExecutor initialized (silent={silent_mode})")
 
@@ -53,6 +105,7 @@ class OpenCoreExecutor:
                 "output": str,
                 "error": str,
                 "exit_code": int,
+                "truncated": bool,  # Output exceeded max_output_bytes
             }
         """
         silent = silent if silent is not None else self.silent_mode
@@ -80,17 +133,10 @@ class OpenCoreExecutor:
             }
 
     async def _opencore_available(self) -> bool:
-        """Check if OpenCore is available."""
-        try:
-            result = await asyncio.create_subprocess_exec(
-                "which", "opencore",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await result.wait()
-            return result.returncode == 0
-        except:
-            return False
+        """Check if OpenCore is available (probed once per executor)."""
+        if self._opencore_cached is None:
+            self._opencore_cached = shutil.which("opencore") is not None
+        return self._opencore_cached
 
     async def _execute_via_opencore(self, command: str, cwd: Path) -> Dict:
         """Execute via OpenCore (preferred method)."""
@@ -101,29 +147,10 @@ class OpenCoreExecutor:
             *args,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
         )
         
-        try:
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=self.timeout,
-            )
-            
-            return {
-                "success": process.returncode == 0,
-                "output": stdout.decode("utf-8", errors="ignore"),
-                "error": stderr.decode("utf-8", errors="ignore"),
-                "exit_code": process.returncode,
-            }
-            
-        except asyncio.TimeoutError:
-            process.kill()
-            return {
-                "success": False,
-                "output": "",
-                "error": f"Command timed out after {self.timeout}s",
-                "exit_code": -1,
-            }
+        return await self._collect(process)
 
     async def _execute_via_subprocess(self, command: str, cwd: Path) -> Dict:
         """Fallback: Execute via subprocess."""
@@ -134,23 +161,41 @@ class OpenCoreExecutor:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             cwd=str(cwd),
+            start_new_session=True,
         )
         
+        return await self._collect(process)
+
+    async def _collect(self, process: asyncio.subprocess.Process) -> Dict:
+        """Wait for a process, keeping at most max_output_bytes of each stream."""
+        stdout = _BoundedBuffer(self.max_output_bytes)
+        stderr = _BoundedBuffer(self.max_output_bytes)
+        
         try:
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
+            await asyncio.wait_for(
+                asyncio.gather(
+                    stdout.drain(process.stdout),
+                    stderr.drain(process.stderr),
+                    process.wait(),
+                ),
                 timeout=self.timeout,
             )
             
             return {
                 "success": process.returncode == 0,
-                "output": stdout.decode("utf-8", errors="ignore"),
-                "error": stderr.decode("utf-8", errors="ignore"),
+                "output": stdout.text(),
+                "error": stderr.text(),
                 "exit_code": process.returncode,
+                "truncated": stdout.truncated or stderr.truncated,
             }
             
+        except asyncio.CancelledError:
+            self._kill(process)
+            await process.wait()
+            raise
         except asyncio.TimeoutError:
-            process.kill()
+            self._kill(process)
+            await process.wait()
             return {
                 "success": False,
                 "output": "",
@@ -158,40 +203,95 @@ class OpenCoreExecutor:
                 "exit_code": -1,
             }
 
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process) -> None:
+        # Kill the whole session so background children release the pipes
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # Already exited
+
     async def execute_batch(
         self,
         commands: List[str],
         stop_on_error: bool = True,
+        concurrency: int = 1,
+        chunk_size: int = 0,
     ) -> List[Dict]:
-        """Execute multiple commands."""
-        results = []
+        """
+        Execute multiple commands.
+        
+        Args:
+            commands: Shell commands, in order
+            stop_on_error: Stop (or cancel outstanding commands) after a failure
+            concurrency: Commands run at once; only use > 1 for independent commands
+            chunk_size: If > 0, run this many commands per shell invocation
+                (one command per line), returning one result per chunk with
+                its "commands" listed
+        """
+        if chunk_size > 0:
+            chunks = [commands[i:i + chunk_size] for i in range(0, len(commands), chunk_size)]
+            jobs = [(self._chunk_script(chunk, stop_on_error), chunk) for chunk in chunks]
+        else:
+            jobs = [(cmd, None) for cmd in commands]
         
-        for cmd in commands:
-            result = await self.execute(cmd)
-            results.append(result)
+        if concurrency <= 1:
+            results = []
+            for cmd, chunk in jobs:
+                result = await self._execute_job(cmd, chunk)
+                results.append(result)
+                
+                if stop_on_error and not result["success"]:
+                    logger.error(f"Command failed, stopping batch: {cmd}")
+                    break
             
-            if stop_on_error and not result["success"]:
-                logger.error(f"Command failed, stopping batch: {cmd}")
-                break
+            return results
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(cmd: str, chunk: Optional[List[str]]) -> Dict:
+            async with semaphore:
+                return await self._execute_job(cmd, chunk)
+        
+        tasks = [asyncio.create_task(run(cmd, chunk)) for cmd, chunk in jobs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if stop_on_error and not result["success"]:
+                    logger.error("Command failed, cancelling rest of batch")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled commands kill and reap their processes
+            await asyncio.gather(*tasks, return_exceptions=True)
         
-        return results
+        # Results of commands that completed, in command order
+        return [
+            task.result() for task in tasks
+            if task.done() and not task.cancelled()
+        ]
+
+    @staticmethod
+    def _chunk_script(chunk: List[str], stop_on_error: bool) -> str:
+        """Join commands into one script, each ending on its own line."""
+        if not stop_on_error:
+            return "\n".join(chunk)
+        # A status check on the following line leaves comments, trailing &
+        # and heredocs in the command itself untouched
+        check = "__rc=$?; [ $__rc -eq 0 ] || exit $__rc"
+        return "\n".join(f"{cmd}\n{check}" for cmd in chunk)
+
+    async def _execute_job(self, command: str, chunk: Optional[List[str]]) -> Dict:
+        result = await self.execute(command)
+        if chunk is not None:
+            result["commands"] = chunk
+        return result
 
     def is_safe_command(self, command: str) -> bool:
         """Check if command is safe to execute."""
-        # Blacklist dangerous commands
-        dangerous = [
-            "rm -rf /",
-            "dd if=",
-            "mkfs",
-            ":(){ :|:& };:",  # Fork bomb
-            "curl | sh",
-            "wget | sh",
-        ]
-        
-        cmd_lower = command.lower()
-        for dangerous_pattern in dangerous:
-            if dangerous_pattern in cmd_lower:
-                logger.error(f"Blocked dangerous command: {command}")
-                return False
+        if _DANGEROUS_RE.search(command):
+            logger.error(f"Blocked dangerous command: {command}")
+            return False
         
         return True
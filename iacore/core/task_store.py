@@ -0,0 +1,209 @@
+"""
+Task Store - Task queue shared by the API and the agent.
+
+Tasks are kept in a SQLite database (.iacore/runtime/tasks.db) indexed by
+id and status. Mutations are committed in batches, off the event loop.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    status TEXT NOT NULL,
+    auto_execute INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+"""
+
+_COLUMNS = ("id", "description", "status", "auto_execute", "created_at", "updated_at")
+
+
+class TaskStore:
+    """
+    SQLite-backed store for agent tasks.
+
+    Mutations are held in memory and committed by a single writer coroutine
+    in one transaction every `flush_interval` seconds or every
+    `max_pending_ops` mutations, whichever comes first. Reads see both
+    committed rows and changes that are still waiting to be flushed.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        flush_interval: float = 0.1,
+        max_pending_ops: int = 100,
+    ):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_pending_ops = max_pending_ops
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._unflushed: Dict[str, Dict[str, Any]] = {}
+        self._pending_ops = 0
+        self._wakeup = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+
+    async def add(self, task: Dict[str, Any]):
+        """Add a new task."""
+        self._unflushed[task["id"]] = dict(task)
+        self._mark_dirty()
+
+    async def update(self, task_id: str, **fields):
+        """Update fields of an existing task."""
+        task = await self.get(task_id)
+        if task is None:
+            logger.warning(f"Cannot update unknown task: {task_id}")
+            return
+
+        task.update(fields)
+        self._unflushed[task_id] = task
+        self._mark_dirty()
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a task by id."""
+        if task_id in self._unflushed:
+            return dict(self._unflushed[task_id])
+
+        rows = await asyncio.to_thread(
+            self._query, "SELECT * FROM tasks WHERE id = ?", (task_id,)
+        )
+        return rows[0] if rows else None
+
+    async def pending(self) -> List[Dict[str, Any]]:
+        """Get tasks waiting to be executed, oldest first."""
+        rows = await asyncio.to_thread(
+            self._query, "SELECT * FROM tasks WHERE status = 'pending' ORDER BY rowid"
+        )
+
+        tasks = {row["id"]: row for row in rows}
+        tasks.update(self._unflushed)
+        return [dict(task) for task in tasks.values() if task.get("status") == "pending"]
+
+    async def close(self):
+        """Stop the writer and flush outstanding changes."""
+        if self._writer_task:
+            self._writer_task.cancel()
+            self._writer_task = None
+
+        if self._unflushed:
+            await self._flush()
+
+        if self._db:
+            self._db.close()
+            self._db = None
+
+    def _mark_dirty(self):
+        self._pending_ops += 1
+
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer())
+
+        if self._pending_ops >= self.max_pending_ops:
+            self._wakeup.set()
+
+    async def _writer(self):
+        """Single writer: commit batched mutations."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if not self._unflushed:
+                # Nothing left to write; the next mutation restarts the writer
+                return
+
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Failed to flush task store: {e}")
+
+    async def _flush(self):
+        """Commit all unflushed tasks in one transaction."""
+        batch = list(self._unflushed.values())
+        self._pending_ops = 0
+
+        await asyncio.to_thread(self._write_rows, batch)
+
+        # Drop flushed entries unless they changed again during the write
+        for task in batch:
+            if self._unflushed.get(task["id"]) is task:
+                del self._unflushed[task["id"]]
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._import_legacy_json(db)
+            self._db = db
+        return self._db
+
+    def _import_legacy_json(self, db: sqlite3.Connection):
+        """One-time import of the tasks.json queue used by older versions."""
+        legacy = self.path.with_name("tasks.json")
+        if not legacy.exists() or db.execute("SELECT 1 FROM tasks LIMIT 1").fetchone():
+            return
+
+        try:
+            tasks = orjson.loads(legacy.read_bytes())
+            with db:
+                db.executemany(self._upsert_sql(), [self._to_row(t) for t in tasks])
+            legacy.rename(legacy.with_suffix(".json.migrated"))
+            logger.info(f"Imported {len(tasks)} tasks from {legacy}")
+        except Exception as e:
+            logger.error(f"Failed to import legacy tasks: {e}")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._db_lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def _write_rows(self, tasks: List[Dict[str, Any]]):
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.executemany(self._upsert_sql(), [self._to_row(t) for t in tasks])
+
+    @staticmethod
+    def _upsert_sql() -> str:
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        return f"INSERT OR REPLACE INTO tasks ({', '.join(_COLUMNS)}) VALUES ({placeholders})"
+
+    @staticmethod
+    def _to_row(task: Dict[str, Any]) -> tuple:
+        return (
+            task["id"],
+            task.get("description", ""),
+            task.get("status", "pending"),
+            int(bool(task.get("auto_execute", False))),
+            task.get("created_at"),
+            task.get("updated_at"),
+        )
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        task = dict(row)
+        task["auto_execute"] = bool(task["auto_execute"])
+        if task["updated_at"] is None:
+            del task["updated_at"]
+        return task
@@ -0,0 +1,178 @@
+"""
+Stdio transport shared by the MCP servers
+"""
+
+import asyncio
+import logging
+import os
+import stat
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Longest JSON-RPC request line accepted on stdin, and stdin read size
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+# Most buffers a single writev call accepts (Linux and macOS limit)
+IOV_MAX = 1024
+
+
+async def wait_writable(fd: int) -> None:
+    """Wait until fd accepts more data"""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+
+    def on_writable() -> None:
+        if not ready.done():
+            ready.set_result(None)
+
+    loop.add_writer(fd, on_writable)
+    try:
+        await ready
+    finally:
+        loop.remove_writer(fd)
+
+
+async def write_responses(fd: int, chunks: List[bytes]) -> None:
+    """Write response chunks to fd with as few writev calls as possible"""
+    i = 0
+    while i < len(chunks):
+        try:
+            if hasattr(os, "writev"):
+                written = os.writev(fd, chunks[i:i + IOV_MAX])
+            else:
+                written = os.write(fd, chunks[i])
+        except BlockingIOError:
+            # stdout can share stdin's file description (a tty or socket),
+            # which connect_read_pipe switched to O_NONBLOCK
+            await wait_writable(fd)
+            continue
+
+        # Skip what was written, resuming mid-chunk after a short write
+        while written:
+            size = len(chunks[i])
+            if written < size:
+                chunks[i] = chunks[i][written:]
+                break
+            written -= size
+            i += 1
+
+
+async def stdin_reader() -> Callable[[], Awaitable[bytes]]:
+    """Return a coroutine function that reads the next chunk of stdin"""
+    fd = sys.stdin.fileno()
+    mode = os.fstat(fd).st_mode
+    if not (stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode) or os.isatty(fd)):
+        # Regular files and devices such as /dev/null can't be polled by the
+        # loop (stdin redirected from a file); read them on a thread
+        return lambda: asyncio.to_thread(os.read, fd, READ_CHUNK_BYTES)
+
+    reader = asyncio.StreamReader()
+    await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+    )
+    return lambda: reader.read(READ_CHUNK_BYTES)
+
+
+class _Responder:
+    """Answers requests, batching their responses into writev calls"""
+
+    def __init__(self, handler: Callable[[Any, Dict], Awaitable[Dict]], concurrent: bool):
+        self.handler = handler
+        self.concurrent = concurrent
+        self.fd = sys.stdout.fileno()
+        # Responses go out in one writev per pass, or when concurrent, per
+        # loop iteration; the lock keeps batches whole and in order when
+        # stdout backs up
+        self.out: List[bytes] = []
+        self.write_lock = asyncio.Lock()
+        self.in_flight: Set[asyncio.Task] = set()
+
+    def track(self, task: asyncio.Task) -> None:
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+
+    async def flush(self) -> None:
+        async with self.write_lock:
+            batch = self.out[:]
+            self.out.clear()
+            try:
+                await write_responses(self.fd, batch)
+            except Exception as e:
+                logger.error(f"Failed to write responses: {e}")
+
+    async def respond(self, request: Dict) -> None:
+        try:
+            response = await self.handler(request.get("method"), request.get("params", {}))
+            response["id"] = request.get("id")
+            response["jsonrpc"] = "2.0"
+
+            if self.concurrent and not self.out:
+                self.track(asyncio.create_task(self.flush()))
+            self.out.extend((orjson.dumps(response), b"\n"))
+        except Exception as e:
+            logger.error(f"Server error: {e}")
+
+    async def close(self) -> None:
+        """Wait for outstanding requests, then for every write"""
+        if self.in_flight:
+            await asyncio.gather(*self.in_flight)
+        await self.flush()
+
+
+async def run_stdio_server(
+    handler: Callable[[Any, Dict], Awaitable[Dict]],
+    concurrent: bool = False,
+) -> None:
+    """
+    Serve JSON-RPC over stdin/stdout, one request per line, until EOF.
+
+    Every complete line already buffered is parsed and answered in one pass.
+    handler(method, params) returns the response body. With concurrent, the
+    requests of a pass run at once and responses (which carry the request
+    id) go out as they finish; otherwise they are answered in order.
+    """
+    read_chunk = await stdin_reader()
+    responder = _Responder(handler, concurrent)
+    pending = bytearray()
+
+    while True:
+        chunk = await read_chunk()
+        if chunk:
+            pending += chunk
+            end = pending.rfind(b"\n")
+            if end < 0:
+                if len(pending) > MAX_REQUEST_BYTES:
+                    logger.error("Request exceeds size limit, discarding")
+                    pending.clear()
+                continue
+            lines = bytes(pending[:end]).split(b"\n")
+            del pending[:end + 1]
+        else:
+            lines = [bytes(pending)]  # EOF: the last line may lack a newline
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = orjson.loads(line)
+            except Exception as e:
+                logger.error(f"Server error: {e}")
+                continue
+            if concurrent:
+                responder.track(asyncio.create_task(responder.respond(request)))
+            else:
+                await responder.respond(request)
+
+        if responder.out and not concurrent:
+            await responder.flush()
+        if not chunk:
+            break
+
+    await responder.close()
@@ -5,16 +5,137 @@ Provides semantic search and code analysis capabilities
 """
 
 import asyncio
-import json
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-import subprocess
+from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import shutil
+import threading
 import os
+import re
+from itertools import islice
+
+import orjson
+
+from ._stdio import run_stdio_server
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Files whose lines and structure are kept in memory, keyed by (path, mtime, size)
+MAX_CACHED_FILES = 1024
+
+# One line-anchored pass for get_file_structure; alternatives are tried in order
+_STRUCTURE_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"def (?P<func>[^(\n]*)"
+    r"|class (?P<cls>[^(:\n]*)"
+    r"|(?P<imp>(?:import|from) [^\n]*)"
+    r"|[^\n]*?function (?P<jsfunc>[^(\n]*)"
+    r")",
+    re.MULTILINE,
+)
+
+# Upper bound on find_definition matches
+MAX_DEFINITIONS = 50
+
+
+# Handlers run in worker threads; guards the LRU caches below
+_cache_lock = threading.Lock()
+
+
+def _cache_get(cache: OrderedDict, key: Any) -> Any:
+    """Look up an LRU-ordered cache entry, marking it most recently used"""
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache: OrderedDict, key: Any, value: Any):
+    """Insert into an LRU-ordered cache, evicting the oldest entries"""
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > MAX_CACHED_FILES:
+            cache.popitem(last=False)
+
+
+class _DirStat:
+    """
+    Stats files relative to their directory (fstatat), keeping one open
+    descriptor per directory so the shared path prefix is resolved once.
+    """
+    
+    def __init__(self, root: Path):
+        self.root = str(root)
+        self.use_dir_fd = os.stat in os.supports_dir_fd
+        self._fds: Dict[str, int] = {}
+    
+    def stat(self, rel_path: str) -> os.stat_result:
+        if not self.use_dir_fd:
+            return os.stat(os.path.join(self.root, rel_path))
+        
+        dirname, name = os.path.split(rel_path)
+        fd = self._fds.get(dirname)
+        if fd is None:
+            fd = os.open(os.path.join(self.root, dirname), os.O_RDONLY | os.O_DIRECTORY)
+            self._fds[dirname] = fd
+        return os.stat(name, dir_fd=fd)
+    
+    def __enter__(self) -> "_DirStat":
+        return self
+    
+    def __exit__(self, *exc):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+
+def _scan_dir(path: str) -> Tuple[List[str], Dict[str, int], int]:
+    """List one directory: subdirectories, file counts by extension, total size"""
+    subdirs = []
+    counts: Dict[str, int] = {}
+    size = 0
+    
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        ext = os.path.splitext(entry.name)[1] or "no_extension"
+                        counts[ext] = counts.get(ext, 0) + 1
+                        size += entry.stat().st_size
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    
+    return subdirs, counts, size
+
+
+def _walk_parallel(root: Path, threads: int = 32) -> Tuple[Dict[str, int], int]:
+    """Count files by extension and sum their sizes, listing directories in parallel"""
+    file_counts: Dict[str, int] = {}
+    total_size = 0
+    
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        running = {pool.submit(_scan_dir, str(root))}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, counts, size = future.result()
+                for ext, count in counts.items():
+                    file_counts[ext] = file_counts.get(ext, 0) + count
+                total_size += size
+                running.update(pool.submit(_scan_dir, d) for d in subdirs)
+    
+    return file_counts, total_size
+
 
 class ContextServer:
     """MCP server for project context and code understanding"""
@@ -22,51 +143,150 @@ class ContextServer:
     def __init__(self, project_root: Optional[Path] = None):
         self.project_root = Path(project_root or os.getenv("PROJECT_ROOT", "."))
         self.index_cache: Dict[str, Any] = {}
+        self._content_cache: "OrderedDict[Tuple[str, int, int], List[str]]" = OrderedDict()
+        self._structure_cache: "OrderedDict[Tuple[str, int, int], Dict]" = OrderedDict()
+        self._rg_path = shutil.which("rg")
+        
+        # Method name -> handler, built once rather than per request
+        self._handlers = {
+            "context/search_files": lambda p: self.search_files(
+                p["pattern"], p.get("file_types")
+            ),
+            "context/read_file": lambda p: self.read_file_content(
+                p["file_path"], p.get("start_line", 0), p.get("end_line", -1),
+                p.get("total_lines", True)
+            ),
+            "context/find_definition": lambda p: self.find_definition(
+                p["symbol"], p.get("file_type")
+            ),
+            "context/get_structure": lambda p: self.get_file_structure(p["file_path"]),
+            "context/project_summary": lambda p: self.get_project_summary(),
+        }
         logger.info(f"Context server initialized for: {self.project_root}")
     
+    def _read_lines(
+        self,
+        full_path: Path,
+        st: Optional[os.stat_result] = None,
+    ) -> Tuple[Tuple[str, int, int], List[str]]:
+        """Lines of a file, re-read only when its mtime or size changed"""
+        st = st or full_path.stat()
+        key = (str(full_path), st.st_mtime_ns, st.st_size)
+        
+        lines = _cache_get(self._content_cache, key)
+        if lines is None:
+            lines = full_path.read_text().split("\n")
+            _cache_put(self._content_cache, key, lines)
+        
+        return key, lines
+    
     async def search_files(self, pattern: str, file_types: Optional[List[str]] = None) -> List[Dict]:
         """Search for files matching pattern"""
-        results = []
-        
         # Use git ls-files if available
-        try:
-            cmd = ["git", "ls-files"]
-            output = subprocess.check_output(
-                cmd, 
-                cwd=self.project_root,
-                text=True,
-                stderr=subprocess.DEVNULL
-            )
-            files = output.strip().split("\n")
-        except:
+        files = await self._list_git_files()
+        if files is None:
             # Fallback to pathlib
-            files = [str(f.relative_to(self.project_root)) 
-                    for f in self.project_root.rglob("*") if f.is_file()]
-        
-        # Filter by pattern and type
-        for file_path in files:
-            if pattern.lower() in file_path.lower():
-                if file_types is None or any(file_path.endswith(ext) for ext in file_types):
-                    full_path = self.project_root / file_path
-                    if full_path.exists():
+            files = await asyncio.to_thread(
+                lambda: [str(f.relative_to(self.project_root))
+                         for f in self.project_root.rglob("*") if f.is_file()]
+            )
+        
+        return await asyncio.to_thread(self._filter_files, files, pattern, file_types)
+    
+    def _filter_files(
+        self,
+        files: List[str],
+        pattern: str,
+        file_types: Optional[List[str]],
+    ) -> List[Dict]:
+        """Filter by pattern and type, stat-ing the kept files"""
+        results = []
+        needle = pattern.lower()
+        suffixes = tuple(file_types) if file_types is not None else None
+        with _DirStat(self.project_root) as dir_stat:
+            for file_path in files:
+                if needle in file_path.lower():
+                    if suffixes is None or file_path.endswith(suffixes):
+                        try:
+                            size = dir_stat.stat(file_path).st_size
+                        except OSError:
+                            continue
                         results.append({
                             "path": file_path,
-                            "size": full_path.stat().st_size,
-                            "type": full_path.suffix
+                            "size": size,
+                            "type": os.path.splitext(file_path)[1]
                         })
+                        if len(results) >= 50:  # Limit results
+                            break
+        
+        return results
+    
+    async def _list_git_files(self) -> Optional[List[str]]:
+        """Tracked files from git ls-files -z, or None outside a repository"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "git", "ls-files", "-z",
+                cwd=self.project_root,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            output, _ = await process.communicate()
+        except OSError:
+            return None
         
-        return results[:50]  # Limit results
+        if process.returncode != 0:
+            return None
+        return [os.fsdecode(name) for name in output.split(b"\0") if name]
     
-    async def read_file_content(self, file_path: str, start_line: int = 0, end_line: int = -1) -> Dict:
+    async def read_file_content(
+        self,
+        file_path: str,
+        start_line: int = 0,
+        end_line: int = -1,
+        total_lines: bool = True,
+    ) -> Dict:
         """Read file content with optional line range"""
+        return await asyncio.to_thread(
+            self._read_file_content_sync, file_path, start_line, end_line, total_lines
+        )
+    
+    def _read_file_content_sync(
+        self,
+        file_path: str,
+        start_line: int,
+        end_line: int,
+        total_lines: bool,
+    ) -> Dict:
         full_path = self.project_root / file_path
         
-        if not full_path.exists():
+        try:
+            st = full_path.stat()
+        except FileNotFoundError:
             return {"error": "File not found"}
+        except Exception as e:
+            return {"error": str(e)}
+        
+        key = (str(full_path), st.st_mtime_ns, st.st_size)
+        ranged = start_line > 0 or end_line != -1
+        streamable = start_line >= 0 and end_line >= -1
         
         try:
-            content = full_path.read_text()
-            lines = content.split("\n")
+            lines = _cache_get(self._content_cache, key)
+            if ranged and streamable and lines is None:
+                # Only read up to the requested range
+                selected_lines = self._read_range(full_path, start_line, end_line)
+                range_end = start_line + len(selected_lines)
+                if end_line != -1:
+                    range_end = min(range_end, end_line)
+                return {
+                    "path": file_path,
+                    "content": "\n".join(selected_lines),
+                    "total_lines": self._count_lines(full_path) if total_lines else None,
+                    "range": [start_line, range_end]
+                }
+            
+            if lines is None:
+                _, lines = self._read_lines(full_path, st)
             
             if end_line == -1:
                 end_line = len(lines)
@@ -82,6 +302,39 @@ class ContextServer:
         except Exception as e:
             return {"error": str(e)}
     
+    @staticmethod
+    def _read_range(full_path: Path, start_line: int, end_line: int) -> List[str]:
+        """
+        Lines [start_line, end_line) of a file as split("\\n") would give them,
+        streamed; end_line -1 reads to EOF
+        """
+        stop = None if end_line == -1 else end_line
+        selected = []
+        count = 0
+        last = ""
+        with full_path.open() as f:
+            for line in islice(f, stop):
+                if count >= start_line:
+                    selected.append(line.rstrip("\n"))
+                count += 1
+                last = line
+        
+        # Reached EOF: split("\n") ends with the text after the last newline,
+        # which is "" for an empty file or one ending in "\n"
+        at_eof = stop is None or count < stop
+        if at_eof and count >= start_line and last[-1:] in ("", "\n"):
+            selected.append("")
+        return selected
+    
+    @staticmethod
+    def _count_lines(full_path: Path) -> int:
+        """Number of lines as split("\\n") would count them, in constant memory"""
+        count = 1
+        with full_path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                count += block.count(b"\n")
+        return count
+    
     async def find_definition(self, symbol: str, file_type: Optional[str] = None) -> List[Dict]:
         """Find definition of a symbol (function, class, variable)"""
         results = []
@@ -94,36 +347,69 @@ class ContextServer:
             f"const {symbol} =",  # JS const
             f"let {symbol} =",  # JS let
         ]
+        pattern_args = [arg for pattern in patterns for arg in ("-e", pattern)]
         
-        for pattern in patterns:
-            try:
-                cmd = ["grep", "-rn", pattern, str(self.project_root)]
-                output = subprocess.check_output(
-                    cmd,
-                    text=True,
-                    stderr=subprocess.DEVNULL
-                )
-                
-                for line in output.strip().split("\n")[:10]:  # Limit results
-                    if ":" in line:
-                        parts = line.split(":", 2)
-                        if len(parts) >= 3:
-                            results.append({
-                                "file": parts[0].replace(str(self.project_root) + "/", ""),
-                                "line": int(parts[1]),
-                                "content": parts[2].strip()
-                            })
-            except:
-                continue
+        # One pass over the tree for all patterns
+        if self._rg_path:
+            cmd = [self._rg_path, "--json", "-n", "-F", "--max-count", "10",
+                   *pattern_args, str(self.project_root)]
+        else:
+            cmd = ["grep", "-rnF", *pattern_args, str(self.project_root)]
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            stdout, _ = await process.communicate()
+            output = stdout.decode("utf-8", errors="replace")
+        except OSError:
+            return results
+        
+        prefix = str(self.project_root) + "/"
+        for line in output.splitlines():
+            if self._rg_path:
+                event = orjson.loads(line)
+                if event.get("type") != "match":
+                    continue
+                data = event["data"]
+                file_name = data["path"].get("text", "")
+                line_number = data["line_number"]
+                content = data["lines"].get("text", "")
+            else:
+                parts = line.split(":", 2)
+                if len(parts) < 3:
+                    continue
+                file_name, line_number, content = parts[0], int(parts[1]), parts[2]
+            
+            results.append({
+                "file": file_name.replace(prefix, ""),
+                "line": line_number,
+                "content": content.strip()
+            })
+            if len(results) >= MAX_DEFINITIONS:
+                break
         
         return results
     
     async def get_file_structure(self, file_path: str) -> Dict:
         """Get structure of a file (functions, classes, etc.)"""
+        return await asyncio.to_thread(self._get_file_structure_sync, file_path)
+    
+    def _get_file_structure_sync(self, file_path: str) -> Dict:
         full_path = self.project_root / file_path
         
-        if not full_path.exists():
+        try:
+            key, lines = self._read_lines(full_path)
+        except FileNotFoundError:
             return {"error": "File not found"}
+        except Exception as e:
+            return {"error": str(e)}
+        
+        cached = _cache_get(self._structure_cache, key)
+        if cached is not None:
+            return {**cached, "path": file_path}
         
         structure = {
             "path": file_path,
@@ -133,29 +419,26 @@ class ContextServer:
         }
         
         try:
-            content = full_path.read_text()
-            lines = content.split("\n")
+            content = "\n".join(lines)
+            line_no, pos = 1, 0
             
-            for i, line in enumerate(lines):
-                stripped = line.strip()
+            for match in _STRUCTURE_RE.finditer(content):
+                line_no += content.count("\n", pos, match.start())
+                pos = match.start()
+                kind = match.lastgroup
                 
-                # Python
-                if stripped.startswith("def "):
-                    func_name = stripped.split("(")[0].replace("def ", "")
-                    structure["functions"].append({"name": func_name, "line": i + 1})
-                elif stripped.startswith("class "):
-                    class_name = stripped.split("(")[0].split(":")[0].replace("class ", "")
-                    structure["classes"].append({"name": class_name, "line": i + 1})
-                elif stripped.startswith("import ") or stripped.startswith("from "):
-                    structure["imports"].append({"statement": stripped, "line": i + 1})
-                
-                # JavaScript/TypeScript
-                elif "function " in stripped:
-                    parts = stripped.split("function ")
-                    if len(parts) > 1:
-                        func_name = parts[1].split("(")[0].strip()
-                        structure["functions"].append({"name": func_name, "line": i + 1})
+                # Python def/class/imports, JavaScript/TypeScript functions
+                if kind in ("func", "jsfunc"):
+                    name = match.group(kind)
+                    if kind == "jsfunc":
+                        name = name.strip()
+                    structure["functions"].append({"name": name, "line": line_no})
+                elif kind == "cls":
+                    structure["classes"].append({"name": match.group(kind), "line": line_no})
+                elif kind == "imp":
+                    structure["imports"].append({"statement": match.group(kind).rstrip(), "line": line_no})
             
+            _cache_put(self._structure_cache, key, structure)
             return structure
             
         except Exception as e:
@@ -170,33 +453,21 @@ class ContextServer:
             "total_size": 0
         }
         
-        for file_path in self.project_root.rglob("*"):
-            if file_path.is_file():
-                ext = file_path.suffix or "no_extension"
-                summary["file_counts"][ext] = summary["file_counts"].get(ext, 0) + 1
-                summary["total_files"] += 1
-                summary["total_size"] += file_path.stat().st_size
+        loop = asyncio.get_running_loop()
+        file_counts, total_size = await loop.run_in_executor(
+            None, _walk_parallel, self.project_root
+        )
+        
+        summary["file_counts"] = file_counts
+        summary["total_files"] = sum(file_counts.values())
+        summary["total_size"] = total_size
         
         return summary
     
     async def handle_request(self, method: str, params: Dict) -> Dict:
         """Handle MCP JSON-RPC request"""
         
-        handlers = {
-            "context/search_files": lambda p: self.search_files(
-                p["pattern"], p.get("file_types")
-            ),
-            "context/read_file": lambda p: self.read_file_content(
-                p["file_path"], p.get("start_line", 0), p.get("end_line", -1)
-            ),
-            "context/find_definition": lambda p: self.find_definition(
-                p["symbol"], p.get("file_type")
-            ),
-            "context/get_structure": lambda p: self.get_file_structure(p["file_path"]),
-            "context/project_summary": lambda p: self.get_project_summary(),
-        }
-        
-        handler = handlers.get(method)
+        handler = self._handlers.get(method)
         if not handler:
             return {"error": f"Unknown method: {method}"}
         
@@ -214,29 +485,7 @@ async def run_server():
     server = ContextServer(project_root)
     logger.info(f"Context MCP Server started for: {project_root}")
     
-    # Simple stdin/stdout JSON-RPC protocol
-    while True:
-        try:
-            line = await asyncio.get_event_loop().run_in_executor(None, input)
-            if not line:
-                continue
-            
-            request = json.loads(line)
-            method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id")
-            
-            response = await server.handle_request(method, params)
-            response["id"] = request_id
-            response["jsonrpc"] = "2.0"
-            
-            print(json.dumps(response), flush=True)
-            
-        except EOFError:
-            break
-        except Exception as e:
-            logger.error(f"Server error: {e}")
-
+    await run_stdio_server(server.handle_request, concurrent=True)
 
 if __name__ == "__main__":
     asyncio.run(run_server())
@@ -5,15 +5,319 @@ Stores and retrieves information across sessions
 """
 
 import asyncio
-import json
+import hashlib
 import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
 from datetime import datetime
 
+import orjson
+
+from ._stdio import run_stdio_server
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hybrid retrieval weights: BM25 keyword score vs. embedding similarity
+KEYWORD_WEIGHT = 0.4
+VECTOR_WEIGHT = 0.6
+CANDIDATES = 50
+
+# Embedding matches below this cosine similarity are treated as unrelated
+MIN_SIMILARITY = 0.4
+
+# Recent (index version, query) -> results kept by LearningIndex.search
+SEARCH_CACHE_SIZE = 256
+
+# Words used for keyword matching, the same way FTS5's default tokenizer splits
+_WORD_RE = re.compile(r"\w+")
+
+# Logged operations between full snapshots of agent_memory.json
+SNAPSHOT_EVERY = 500
+
+# Queued WAL records are written every FLUSH_INTERVAL seconds or FLUSH_MAX_OPS records
+FLUSH_INTERVAL = 0.05
+FLUSH_MAX_OPS = 100
+
+# fdatasync skips the metadata flush; not every platform provides it
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+
+class LearningIndex:
+    """
+    In-memory search index over learnings.
+    
+    Keyword relevance comes from an SQLite FTS5 table (BM25). When
+    sentence-transformers is installed, learnings are also embedded and
+    scored by cosine similarity (one matrix-vector product over the
+    L2-normalized embeddings); both scores are normalized to [0, 1] and
+    combined. Without FTS5 it falls back to keyword overlap.
+    
+    Embeddings are computed in batches on a worker thread by a background
+    task and, given a store_path, persisted there keyed by model and text,
+    so restarts only encode learnings that were never embedded before.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None, store_path: Optional[Path] = None):
+        self.model_name = model_name or os.getenv("IACORE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self.store_path = store_path
+        self._db = sqlite3.connect(":memory:")
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE learnings_fts USING fts5(context, lesson)")
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite FTS5 unavailable, using keyword overlap for learnings")
+            self.has_fts = False
+        
+        self._learnings: List[Dict] = []
+        self._inverted: Dict[str, Set[int]] = {}  # Context word -> ids, without FTS5
+        self._vector_ids: List[int] = []
+        self._vector_rows: List[Any] = []  # Unit-length float32 embeddings
+        self._matrix: Any = None  # _vector_rows stacked, rebuilt after adds
+        self._unembedded: List[int] = []  # Ids waiting for an embedding
+        self._embedding: Optional[asyncio.Task] = None
+        self._embedder: Any = None  # Loaded on first use; False if unavailable
+        self._embedder_lock = threading.Lock()
+        self._store: Optional[sqlite3.Connection] = None  # Opened on first use
+        self._store_lock = threading.Lock()
+        self._closed = False
+        self._results: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+    
+    def add(self, learning: Dict):
+        """Index a learning; its position is its id. It is embedded in the background."""
+        self._learnings.append(learning)
+        rowid = len(self._learnings)
+        
+        if self.has_fts:
+            self._db.execute(
+                "INSERT INTO learnings_fts (rowid, context, lesson) VALUES (?, ?, ?)",
+                (rowid, learning.get("context", ""), learning.get("lesson", "")),
+            )
+        else:
+            for word in self._tokens(learning.get("context", "")):
+                self._inverted.setdefault(word, set()).add(rowid)
+        
+        if self._embedder is not False:
+            self._unembedded.append(rowid)
+            self._schedule_embedding()
+    
+    async def search(self, context: str, limit: int = 10) -> List[Dict]:
+        """Learnings most relevant to context, best first (memoized)."""
+        # Results include every learning added so far, embedded or not
+        self._schedule_embedding()
+        if self._embedding is not None:
+            await asyncio.shield(self._embedding)
+        
+        # Learnings are append-only, so their count versions the index
+        key = (len(self._learnings), context, limit)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            return list(cached)
+        
+        results = await self._search(context, limit)
+        self._results[key] = results
+        while len(self._results) > SEARCH_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return list(results)
+    
+    async def aclose(self):
+        """Stop background embedding and close the vector store."""
+        self._closed = True
+        if self._embedding is not None:
+            self._embedding.cancel()
+            self._embedding = None
+        with self._store_lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+    
+    async def _search(self, context: str, limit: int) -> List[Dict]:
+        if not self.has_fts:
+            return self._keyword_overlap(context, limit)
+        
+        scores: Dict[int, float] = {}
+        
+        for rowid, score in self._keyword_scores(context).items():
+            scores[rowid] = KEYWORD_WEIGHT * score
+        
+        if self._vector_rows:
+            query = (await asyncio.to_thread(self._encode, [context]))[0]
+            if query is not None:
+                for rowid, similarity in self._vector_scores(query).items():
+                    scores[rowid] = scores.get(rowid, 0.0) + VECTOR_WEIGHT * similarity
+        
+        ranked = sorted(scores, key=lambda rowid: (scores[rowid], rowid), reverse=True)
+        return [self._learnings[rowid - 1] for rowid in ranked[:limit]]
+    
+    def _keyword_scores(self, context: str) -> Dict[int, float]:
+        """BM25 scores of keyword matches, normalized to [0, 1]."""
+        terms = self._tokens(context)
+        if not terms:
+            return {}
+        
+        query = " OR ".join(f'"{term}"' for term in terms)
+        rows = self._db.execute(
+            "SELECT rowid, bm25(learnings_fts) FROM learnings_fts "
+            "WHERE learnings_fts MATCH ? ORDER BY bm25(learnings_fts) LIMIT ?",
+            (query, CANDIDATES),
+        ).fetchall()
+        if not rows:
+            return {}
+        
+        # bm25() is lower-is-better and negative
+        best = max(-score for _, score in rows) or 1.0
+        return {rowid: max(-score, 0.0) / best for rowid, score in rows}
+    
+    def _keyword_overlap(self, context: str, limit: int) -> List[Dict]:
+        """Most recent learnings sharing a context word, via the inverted index."""
+        candidates: Set[int] = set()
+        for word in self._tokens(context):
+            candidates.update(self._inverted.get(word, ()))
+        
+        return [self._learnings[rowid - 1] for rowid in sorted(candidates)[-limit:]]
+    
+    @staticmethod
+    def _tokens(text: str) -> Set[str]:
+        """Lowercased words of text, normalized once when indexed or queried."""
+        return set(_WORD_RE.findall(text.lower()))
+    
+    def _vector_scores(self, query: Any) -> Dict[int, float]:
+        """Cosine similarity of the best CANDIDATES embeddings above MIN_SIMILARITY."""
+        import numpy as np
+        
+        if not self._vector_rows:
+            return {}
+        if self._matrix is None or len(self._matrix) != len(self._vector_rows):
+            self._matrix = np.vstack(self._vector_rows)
+        
+        # Rows and query are unit length, so the dot product is the cosine
+        similarities = self._matrix @ query
+        count = min(CANDIDATES, len(similarities))
+        top = np.argpartition(-similarities, count - 1)[:count]
+        return {
+            self._vector_ids[i]: float(similarities[i])
+            for i in top
+            if similarities[i] >= MIN_SIMILARITY
+        }
+    
+    def _schedule_embedding(self):
+        """Start the background embedding task if learnings are waiting."""
+        if not self._unembedded or self._closed:
+            return
+        if self._embedding is not None and not self._embedding.done():
+            return  # The running task picks up new learnings too
+        try:
+            self._embedding = asyncio.get_running_loop().create_task(self._embed_pending())
+        except RuntimeError:
+            pass  # No event loop yet; the first search starts it
+    
+    async def _embed_pending(self):
+        """Embed waiting learnings in batches until none are left."""
+        while self._unembedded:
+            rowids, self._unembedded = self._unembedded, []
+            texts = [self._text(self._learnings[rowid - 1]) for rowid in rowids]
+            try:
+                vectors = await asyncio.to_thread(self._stored_vectors, texts)
+            except Exception as e:
+                logger.error(f"Failed to embed learnings: {e}")
+                return
+            
+            for rowid, vector in zip(rowids, vectors):
+                if vector is not None:
+                    self._vector_ids.append(rowid)
+                    self._vector_rows.append(vector)
+    
+    @staticmethod
+    def _text(learning: Dict) -> str:
+        return f"{learning.get('lesson', '')} {learning.get('context', '')}"
+    
+    def _stored_vectors(self, texts: List[str]) -> List[Optional[Any]]:
+        """Embeddings for texts, reading and filling the persistent store (worker thread)."""
+        if self._load_embedder() is None:
+            return [None] * len(texts)
+        
+        import numpy as np
+        
+        keys = [hashlib.sha256(f"{self.model_name}\0{text}".encode()).digest() for text in texts]
+        with self._store_lock:
+            stored = self._read_store(keys)
+        
+        missing = {key: text for key, text in zip(keys, texts) if key not in stored}
+        if missing:
+            encoded = self._encode(list(missing.values()))
+            rows = [
+                (key, b"" if vector is None else vector.tobytes())
+                for key, vector in zip(missing, encoded)
+            ]
+            with self._store_lock:
+                self._write_store(rows)
+            stored.update(rows)
+        
+        # An empty blob records a text whose embedding was a zero vector
+        return [
+            np.frombuffer(stored[key], dtype=np.float32) if stored[key] else None
+            for key in keys
+        ]
+    
+    def _connect_store(self) -> Optional[sqlite3.Connection]:
+        if self._store is None and self.store_path is not None and not self._closed:
+            self._store = sqlite3.connect(self.store_path, check_same_thread=False)
+            self._store.execute("PRAGMA journal_mode=WAL")
+            self._store.execute(
+                "CREATE TABLE IF NOT EXISTS vectors (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+        return self._store
+    
+    def _read_store(self, keys: List[bytes]) -> Dict[bytes, bytes]:
+        db = self._connect_store()
+        if db is None:
+            return {}
+        
+        found: Dict[bytes, bytes] = {}
+        for start in range(0, len(keys), 500):  # Stay below SQLite's variable limit
+            batch = keys[start:start + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            found.update(db.execute(
+                f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return found
+    
+    def _write_store(self, rows: List[tuple]):
+        db = self._connect_store()
+        if db is None:
+            return
+        with db:
+            db.executemany("INSERT OR REPLACE INTO vectors (key, vector) VALUES (?, ?)", rows)
+    
+    def _load_embedder(self) -> Any:
+        """The sentence-transformers model, or None when unavailable."""
+        with self._embedder_lock:
+            if self._embedder is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._embedder = SentenceTransformer(self.model_name)
+                except Exception as e:
+                    logger.info(f"Embeddings disabled for learnings: {e}")
+                    self._embedder = False
+        return self._embedder or None
+    
+    def _encode(self, texts: List[str]) -> List[Optional[Any]]:
+        """Unit-length float32 embeddings of texts in one batch; None for zero vectors."""
+        embedder = self._load_embedder()
+        if embedder is None:
+            return [None] * len(texts)
+        
+        # numpy comes with sentence-transformers
+        import numpy as np
+        vectors = np.asarray(embedder.encode(texts, normalize_embeddings=True), dtype=np.float32)
+        return [vector if vector.any() else None for vector in vectors]
+
 
 class MemoryServer:
     """MCP server for agent memory management"""
@@ -22,38 +326,183 @@ class MemoryServer:
         self.storage_path = storage_path or Path.home() / ".iacore" / "memory"
         self.storage_path.mkdir(parents=True, exist_ok=True)
         self.memory_file = self.storage_path / "agent_memory.json"
+        self.wal_file = self.storage_path / "memory.wal"
+        self._seq = 0
+        self._pending: List[bytes] = []
+        self._dirty = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closing = False  # Set by aclose: flush without waiting, then stop
         self.memory: Dict[str, Any] = self._load_memory()
+        self._wal_fd = os.open(self.wal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        
+        self.learning_index = LearningIndex(store_path=self.storage_path / "learning_vectors.sqlite")
+        for learning in self.memory["learnings"]:
+            self.learning_index.add(learning)
+        
+        # Method name -> handler, built once. Handlers receive the params and
+        # one timestamp for the whole request
+        self._handlers = {
+            "memory/store_fact": lambda p, ts: self.store_fact(p["key"], p["value"], ts),
+            "memory/retrieve_fact": lambda p, ts: self.retrieve_fact(p["key"]),
+            "memory/store_decision": lambda p, ts: self.store_decision(
+                p["decision"], p["reasoning"], p.get("outcome"), ts
+            ),
+            "memory/store_learning": lambda p, ts: self.store_learning(
+                p["lesson"], p["context"], ts
+            ),
+            "memory/get_learnings": lambda p, ts: self.get_relevant_learnings(p["context"]),
+            "memory/update_context": lambda p, ts: self.update_project_context(
+                p["key"], p["value"], ts
+            ),
+            "memory/get_context": lambda p, ts: self.get_project_context(),
+        }
         
     def _load_memory(self) -> Dict[str, Any]:
-        """Load memory from disk"""
+        """Load the memory snapshot and replay the write-ahead log"""
+        memory = None
         if self.memory_file.exists():
             try:
-                return json.loads(self.memory_file.read_text())
+                memory = orjson.loads(self.memory_file.read_bytes())
             except Exception as e:
                 logger.error(f"Failed to load memory: {e}")
         
-        return {
-            "facts": {},
-            "decisions": [],
-            "learnings": [],
-            "project_context": {},
-            "created_at": datetime.now().isoformat()
-        }
+        if memory is None:
+            memory = {
+                "facts": {},
+                "decisions": [],
+                "learnings": [],
+                "project_context": {},
+                "created_at": datetime.now().isoformat()
+            }
+        
+        self._seq = memory.get("wal_seq", 0)
+        if self.wal_file.exists():
+            with open(self.wal_file, "rb") as wal:
+                for line in wal:
+                    try:
+                        record = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        logger.warning("Ignoring truncated memory WAL record")
+                        break
+                    
+                    # Records up to wal_seq are already in the snapshot
+                    if record["seq"] > self._seq:
+                        self._apply(memory, record)
+                        self._seq = record["seq"]
+        
+        return memory
+    
+    @staticmethod
+    def _apply(memory: Dict[str, Any], record: Dict[str, Any]):
+        """Apply one logged operation to the memory dict"""
+        op = record["op"]
+        if op == "fact":
+            memory["facts"][record["key"]] = record["entry"]
+        elif op == "decision":
+            memory["decisions"].append(record["entry"])
+        elif op == "learning":
+            memory["learnings"].append(record["entry"])
+        elif op == "context":
+            memory["project_context"][record["key"]] = record["entry"]
+    
+    def _record(self, op: str, entry: Dict[str, Any], key: Optional[str] = None):
+        """Apply an operation and queue it for the write-ahead log"""
+        self._seq += 1
+        record = {"seq": self._seq, "op": op, "entry": entry}
+        if key is not None:
+            record["key"] = key
+        
+        self._apply(self.memory, record)
+        self._pending.append(orjson.dumps(record) + b"\n")
+        
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flusher())
+        if len(self._pending) >= FLUSH_MAX_OPS:
+            self._dirty.set()
+    
+    async def _flusher(self):
+        """Single writer: commit queued records every FLUSH_INTERVAL seconds"""
+        while True:
+            if not self._closing:
+                try:
+                    await asyncio.wait_for(self._dirty.wait(), timeout=FLUSH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            self._dirty.clear()
+            
+            if not self._pending:
+                # Idle; the next record restarts the flusher
+                return
+            
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Failed to flush memory: {e}")
     
-    def _save_memory(self):
-        """Persist memory to disk"""
+    async def _flush(self):
+        """Append queued records in one write; snapshot when the log is long"""
+        batch, self._pending = b"".join(self._pending), []
+        await asyncio.to_thread(self._write_wal, batch)
+        
+        if self._seq - self.memory.get("wal_seq", 0) >= SNAPSHOT_EVERY:
+            await self._save_memory()
+    
+    def _write_wal(self, data: bytes):
+        """Append a batch and make it durable with a single sync.
+        
+        Records are acknowledged before they reach disk; a crash can lose
+        at most the last FLUSH_INTERVAL worth of writes, in exchange for
+        one sync per batch instead of one per operation.
+        """
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._wal_fd, view):]
+        _datasync(self._wal_fd)
+    
+    async def _save_memory(self):
+        """Write a full snapshot to disk and reset the write-ahead log"""
         try:
-            self.memory_file.write_text(json.dumps(self.memory, indent=2))
+            # Serialized on the loop so the dict cannot change underneath
+            self.memory["wal_seq"] = self._seq
+            snapshot = orjson.dumps(self.memory, option=orjson.OPT_INDENT_2)
+            await asyncio.to_thread(self._write_snapshot, snapshot)
         except Exception as e:
             logger.error(f"Failed to save memory: {e}")
     
-    async def store_fact(self, key: str, value: Any) -> Dict[str, str]:
+    def _write_snapshot(self, snapshot: bytes):
+        tmp_file = self.memory_file.with_suffix(".json.tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())  # The snapshot must be on disk before the log is dropped
+        os.replace(tmp_file, self.memory_file)
+        
+        # Records queued since the snapshot was taken are written after this
+        os.ftruncate(self._wal_fd, 0)
+    
+    async def aclose(self):
+        """Drain queued records, compact the log into the snapshot and close it"""
+        # Let the flusher finish rather than cancelling it: a write it has
+        # already handed to a thread would keep running alongside ours
+        self._closing = True
+        if self._flush_task:
+            self._dirty.set()
+            await self._flush_task
+            self._flush_task = None
+        
+        if self._pending:
+            await self._flush()
+        if self._seq > self.memory.get("wal_seq", 0):
+            await self._save_memory()
+        os.close(self._wal_fd)
+        await self.learning_index.aclose()
+    
+    async def store_fact(self, key: str, value: Any, timestamp: Optional[str] = None) -> Dict[str, str]:
         """Store a fact in memory"""
-        self.memory["facts"][key] = {
+        self._record("fact", {
             "value": value,
-            "timestamp": datetime.now().isoformat()
-        }
-        self._save_memory()
+            "timestamp": timestamp or datetime.now().isoformat()
+        }, key=key)
         return {"status": "stored", "key": key}
     
     async def retrieve_fact(self, key: str) -> Optional[Any]:
@@ -61,47 +510,43 @@ class MemoryServer:
         fact = self.memory["facts"].get(key)
         return fact["value"] if fact else None
     
-    async def store_decision(self, decision: str, reasoning: str, outcome: Optional[str] = None):
+    async def store_decision(
+        self,
+        decision: str,
+        reasoning: str,
+        outcome: Optional[str] = None,
+        timestamp: Optional[str] = None,
+    ):
         """Store a decision made by the agent"""
-        self.memory["decisions"].append({
+        self._record("decision", {
             "decision": decision,
             "reasoning": reasoning,
             "outcome": outcome,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp or datetime.now().isoformat()
         })
-        self._save_memory()
         return {"status": "decision_recorded"}
     
-    async def store_learning(self, lesson: str, context: str):
+    async def store_learning(self, lesson: str, context: str, timestamp: Optional[str] = None):
         """Store a learning from experience"""
-        self.memory["learnings"].append({
+        learning = {
             "lesson": lesson,
             "context": context,
-            "timestamp": datetime.now().isoformat()
-        })
-        self._save_memory()
+            "timestamp": timestamp or datetime.now().isoformat()
+        }
+        self._record("learning", learning)
+        self.learning_index.add(learning)
         return {"status": "learning_recorded"}
     
     async def get_relevant_learnings(self, context: str) -> List[Dict]:
         """Get learnings relevant to current context"""
-        # Simple keyword matching for now
-        keywords = set(context.lower().split())
-        relevant = []
-        
-        for learning in self.memory["learnings"]:
-            learning_keywords = set(learning["context"].lower().split())
-            if keywords & learning_keywords:  # Intersection
-                relevant.append(learning)
-        
-        return relevant[-10:]  # Last 10 relevant learnings
+        return await self.learning_index.search(context, limit=10)
     
-    async def update_project_context(self, key: str, value: Any):
+    async def update_project_context(self, key: str, value: Any, timestamp: Optional[str] = None):
         """Update project-specific context"""
-        self.memory["project_context"][key] = {
+        self._record("context", {
             "value": value,
-            "updated_at": datetime.now().isoformat()
-        }
-        self._save_memory()
+            "updated_at": timestamp or datetime.now().isoformat()
+        }, key=key)
         return {"status": "context_updated"}
     
     async def get_project_context(self) -> Dict[str, Any]:
@@ -111,61 +556,25 @@ class MemoryServer:
     async def handle_request(self, method: str, params: Dict) -> Dict:
         """Handle MCP JSON-RPC request"""
         
-        handlers = {
-            "memory/store_fact": lambda p: self.store_fact(p["key"], p["value"]),
-            "memory/retrieve_fact": lambda p: self.retrieve_fact(p["key"]),
-            "memory/store_decision": lambda p: self.store_decision(
-                p["decision"], p["reasoning"], p.get("outcome")
-            ),
-            "memory/store_learning": lambda p: self.store_learning(
-                p["lesson"], p["context"]
-            ),
-            "memory/get_learnings": lambda p: self.get_relevant_learnings(p["context"]),
-            "memory/update_context": lambda p: self.update_project_context(
-                p["key"], p["value"]
-            ),
-            "memory/get_context": lambda p: self.get_project_context(),
-        }
-        
-        handler = handlers.get(method)
+        handler = self._handlers.get(method)
         if not handler:
             return {"error": f"Unknown method: {method}"}
         
         try:
-            result = await handler(params)
+            result = await handler(params, datetime.now().isoformat())
             return {"result": result}
         except Exception as e:
             logger.error(f"Error handling {method}: {e}")
             return {"error": str(e)}
 
 
-async def run_server():
+async def run_server() -> None:
     """Run the MCP memory server"""
     server = MemoryServer()
     logger.info("Memory MCP Server started")
     
-    # Simple stdin/stdout JSON-RPC protocol
-    while True:
-        try:
-            line = await asyncio.get_event_loop().run_in_executor(None, input)
-            if not line:
-                continue
-            
-            request = json.loads(line)
-            method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id")
-            
-            response = await server.handle_request(method, params)
-            response["id"] = request_id
-            response["jsonrpc"] = "2.0"
-            
-            print(json.dumps(response), flush=True)
-            
-        except EOFError:
-            break
-        except Exception as e:
-            logger.error(f"Server error: {e}")
+    await run_stdio_server(server.handle_request)
+    await server.aclose()
 
 
 if __name__ == "__main__":
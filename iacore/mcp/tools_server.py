@@ -5,23 +5,67 @@ Provides safe command execution and code modification capabilities
 """
 
 import asyncio
-import json
 import logging
+import re
+import shlex
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Deque, Dict, List, Any, Optional, Tuple
 import subprocess
+import shutil
 import os
+from collections import deque
+from itertools import islice
+
+import orjson
+
+from ._stdio import MAX_REQUEST_BYTES, run_stdio_server
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Commands refused by execute_command, matched in a single pass
+_DANGEROUS_RE = re.compile(r"rm\s+-rf|sudo|shutdown|reboot|>\s*/dev/")
+
+# Commands containing any of these need /bin/sh (pipes, redirects, globs, expansions)
+_SHELL_META_RE = re.compile(r"[|&;<>()$`*?\[\]{}~#!\\\n]")
+
+# Commands kept in history, and output kept per stream for each of them
+MAX_HISTORY = 1000
+MAX_HISTORY_OUTPUT = 64 * 1024
+
+# os.open flags for the write_file modes handled without the text layer
+_WRITE_FLAGS = {
+    "w": os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    "a": os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+}
+
+# Manifest files inspected by analyze_dependencies
+DEPENDENCY_MANIFESTS = ("package.json", "requirements.txt", "Cargo.toml", "go.mod")
+
 
 class ToolsServer:
     """MCP server for executable tools"""
     
     def __init__(self, project_root: Optional[Path] = None):
-        self.project_root = Path(project_root or os.getenv("PROJECT_ROOT", "."))
-        self.command_history: List[Dict] = []
+        self.project_root = Path(project_root or os.environ.get("PROJECT_ROOT", "."))
+        self.command_history: Deque[Dict] = deque(maxlen=MAX_HISTORY)
+        self._rg_path = shutil.which("rg")
+        self._dep_cache: Optional[tuple] = None  # (manifest signature, result)
+        
+        # Method name -> handler, built once rather than per request
+        self._handlers = {
+            "tools/execute_command": lambda p: self.execute_command(
+                p["command"], p.get("cwd"), p.get("timeout", 30)
+            ),
+            "tools/write_file": lambda p: self.write_file(
+                p["file_path"], p["content"], p.get("mode", "w")
+            ),
+            "tools/search_code": lambda p: self.search_code(
+                p["pattern"], p.get("file_pattern", "*")
+            ),
+            "tools/analyze_dependencies": lambda p: self.analyze_dependencies(),
+            "tools/command_history": lambda p: self.get_command_history(p.get("limit", 10)),
+        }
         logger.info(f"Tools server initialized for: {self.project_root}")
     
     async def execute_command(
@@ -33,21 +77,13 @@ class ToolsServer:
         """Execute a shell command safely"""
         
         # Blacklist dangerous commands
-        dangerous = ["rm -rf", "sudo", "shutdown", "reboot", "> /dev/"]
-        if any(d in command for d in dangerous):
+        if _DANGEROUS_RE.search(command):
             return {"error": "Command blocked for safety", "command": command}
         
         work_dir = self.project_root / cwd if cwd else self.project_root
         
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                cwd=work_dir,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
+            result = self._run_command(command, work_dir, timeout)
             
             output = {
                 "command": command,
@@ -57,7 +93,11 @@ class ToolsServer:
                 "success": result.returncode == 0
             }
             
-            self.command_history.append(output)
+            # Keep history small: long outputs are stored truncated
+            entry = dict(output)
+            entry["stdout"] = result.stdout[:MAX_HISTORY_OUTPUT]
+            entry["stderr"] = result.stderr[:MAX_HISTORY_OUTPUT]
+            self.command_history.append(entry)
             return output
             
         except subprocess.TimeoutExpired:
@@ -65,6 +105,40 @@ class ToolsServer:
         except Exception as e:
             return {"error": str(e), "command": command}
     
+    @staticmethod
+    def _run_command(command: str, work_dir: Path, timeout: int) -> subprocess.CompletedProcess:
+        """Exec simple commands directly; go through the shell only when needed"""
+        argv = None
+        if not _SHELL_META_RE.search(command):
+            try:
+                argv = shlex.split(command)
+            except ValueError:
+                argv = None
+            # Leading VAR=value assignments are handled by the shell
+            if argv and "=" in argv[0]:
+                argv = None
+        
+        if argv:
+            try:
+                return subprocess.run(
+                    argv,
+                    cwd=work_dir,
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout
+                )
+            except FileNotFoundError:
+                pass  # Shell builtin (cd, export, ...) or unknown program
+        
+        return subprocess.run(
+            command,
+            shell=True,
+            cwd=work_dir,
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    
     async def write_file(self, file_path: str, content: str, mode: str = "w") -> Dict:
         """Write content to a file"""
         full_path = self.project_root / file_path
@@ -73,49 +147,127 @@ class ToolsServer:
             # Create parent directories
             full_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Write file
-            with open(full_path, mode) as f:
-                f.write(content)
+            # Write file: plain write/append go straight to the descriptor
+            flags = _WRITE_FLAGS.get(mode)
+            if flags is not None and isinstance(content, str):
+                data = content.encode("utf-8")
+                fd = os.open(full_path, flags, 0o666)
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                finally:
+                    os.close(fd)
+                size = len(data)
+            else:
+                # Same UTF-8 encoding as the descriptor path, so bytes is exact
+                encoding = None if "b" in mode else "utf-8"
+                with open(full_path, mode, encoding=encoding) as f:
+                    f.write(content)
+                size = len(content) if isinstance(content, bytes) else len(content.encode("utf-8"))
             
             return {
                 "success": True,
                 "path": file_path,
-                "size": len(content)
+                "size": len(content),
+                "bytes": size
             }
         except Exception as e:
             return {"error": str(e), "path": file_path}
     
     async def search_code(self, pattern: str, file_pattern: str = "*") -> Dict:
-        """Search code for a pattern"""
+        """
+        Search code for a pattern.
+        
+        pattern is an extended regular expression (grep -E syntax, which
+        ripgrep also accepts); escape metacharacters such as "(" to match
+        them literally. Ignored and hidden files are searched, as with
+        grep -r. An invalid pattern or an unreadable file returns an
+        "error" alongside any matches found.
+        """
         try:
-            cmd = ["grep", "-rn", pattern, str(self.project_root)]
-            output = subprocess.check_output(
-                cmd,
-                text=True,
-                stderr=subprocess.DEVNULL
-            )
+            if self._rg_path:
+                # Same file set as grep -r: don't apply .gitignore or skip dotfiles
+                cmd = [self._rg_path, "--json", "-n", "--no-ignore", "--hidden", "-e", pattern]
+                if file_pattern != "*":
+                    cmd += ["--glob", file_pattern]
+            else:
+                cmd = ["grep", "-rnE", "-e", pattern]
+                if file_pattern != "*":
+                    cmd.append(f"--include={file_pattern}")
+            cmd += ["--", str(self.project_root)]
             
-            results = []
-            for line in output.strip().split("\n")[:50]:  # Limit results
-                if ":" in line:
-                    parts = line.split(":", 2)
-                    if len(parts) >= 3:
-                        results.append({
-                            "file": parts[0].replace(str(self.project_root) + "/", ""),
-                            "line": int(parts[1]),
-                            "content": parts[2].strip()
-                        })
+            # Stream matches and stop the search once the limit is reached
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=MAX_REQUEST_BYTES,
+            )
+            assert process.stdout is not None and process.stderr is not None
+            errors = asyncio.create_task(process.stderr.read())
+            try:
+                results = await self._collect_matches(process.stdout)
+            finally:
+                # Stop a search cut short by the limit. After EOF just reap it:
+                # kill() would poll and reap the child itself, leaving asyncio
+                # with a bogus exit code
+                if not process.stdout.at_eof():
+                    try:
+                        process.kill()
+                    except ProcessLookupError:
+                        pass
+                await process.wait()
+            stderr = await errors
             
-            return {"results": results, "count": len(results)}
+            response: Dict[str, Any] = {"results": results, "count": len(results)}
+            # Both grep and rg exit with 2 on errors (bad pattern, unreadable path)
+            if process.returncode == 2:
+                message = stderr.decode("utf-8", errors="replace").strip()
+                response["error"] = message[-4096:] or "Search failed"
+            return response
             
-        except subprocess.CalledProcessError:
-            return {"results": [], "count": 0}
         except Exception as e:
             return {"error": str(e)}
     
+    async def _collect_matches(self, stdout: asyncio.StreamReader, limit: int = 50) -> List[Dict]:
+        """Parse rg --json or grep -n output lines into match dicts"""
+        results = []
+        root = str(self.project_root)
+        async for line in stdout:
+            if self._rg_path:
+                event = orjson.loads(line)
+                if event.get("type") != "match":
+                    continue
+                data = event["data"]
+                file_name = data["path"].get("text", "")
+                line_number = data["line_number"]
+                content = data["lines"].get("text", "")
+            else:
+                parts = line.decode("utf-8", errors="replace").split(":", 2)
+                if len(parts) < 3:
+                    continue
+                file_name, line_number, content = parts[0], int(parts[1]), parts[2]
+            
+            results.append({
+                "file": os.path.relpath(file_name, root),
+                "line": line_number,
+                "content": content.strip()
+            })
+            if len(results) >= limit:
+                break
+        
+        return results
+    
     async def analyze_dependencies(self) -> Dict:
         """Analyze project dependencies"""
-        deps = {
+        # Reuse the last result while no manifest changed (mtime_ns, size)
+        signature = self._manifest_signature()
+        if self._dep_cache and self._dep_cache[0] == signature:
+            return self._dep_cache[1]
+        
+        deps: Dict[str, Any] = {
             "package_managers": [],
             "dependencies": {},
             "dev_dependencies": {}
@@ -126,7 +278,7 @@ class ToolsServer:
         if package_json.exists():
             deps["package_managers"].append("npm")
             try:
-                pkg_data = json.loads(package_json.read_text())
+                pkg_data = orjson.loads(package_json.read_bytes())
                 deps["dependencies"]["npm"] = list(pkg_data.get("dependencies", {}).keys())
                 deps["dev_dependencies"]["npm"] = list(pkg_data.get("devDependencies", {}).keys())
             except:
@@ -152,30 +304,31 @@ class ToolsServer:
         if go_mod.exists():
             deps["package_managers"].append("go")
         
+        self._dep_cache = (signature, deps)
         return deps
     
+    def _manifest_signature(self) -> tuple:
+        """(mtime_ns, size) of each dependency manifest, None if missing"""
+        signature: List[Optional[Tuple[int, int]]] = []
+        for name in DEPENDENCY_MANIFESTS:
+            try:
+                st = os.stat(self.project_root / name)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
     async def get_command_history(self, limit: int = 10) -> List[Dict]:
         """Get recent command history"""
-        return self.command_history[-limit:]
+        if limit <= 0:
+            # Same as list[-limit:]: 0 returns everything, -n skips the oldest n
+            return list(islice(self.command_history, -limit, None))
+        return list(islice(reversed(self.command_history), limit))[::-1]
     
     async def handle_request(self, method: str, params: Dict) -> Dict:
         """Handle MCP JSON-RPC request"""
         
-        handlers = {
-            "tools/execute_command": lambda p: self.execute_command(
-                p["command"], p.get("cwd"), p.get("timeout", 30)
-            ),
-            "tools/write_file": lambda p: self.write_file(
-                p["file_path"], p["content"], p.get("mode", "w")
-            ),
-            "tools/search_code": lambda p: self.search_code(
-                p["pattern"], p.get("file_pattern", "*")
-            ),
-            "tools/analyze_dependencies": lambda p: self.analyze_dependencies(),
-            "tools/command_history": lambda p: self.get_command_history(p.get("limit", 10)),
-        }
-        
-        handler = handlers.get(method)
+        handler = self._handlers.get(method)
         if not handler:
             return {"error": f"Unknown method: {method}"}
         
@@ -187,34 +340,13 @@ class ToolsServer:
             return {"error": str(e)}
 
 
-async def run_server():
+async def run_server() -> None:
     """Run the MCP tools server"""
     project_root = os.getenv("PROJECT_ROOT", ".")
-    server = ToolsServer(project_root)
+    server = ToolsServer(Path(project_root))
     logger.info(f"Tools MCP Server started for: {project_root}")
     
-    # Simple stdin/stdout JSON-RPC protocol
-    while True:
-        try:
-            line = await asyncio.get_event_loop().run_in_executor(None, input)
-            if not line:
-                continue
-            
-            request = json.loads(line)
-            method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id")
-            
-            response = await server.handle_request(method, params)
-            response["id"] = request_id
-            response["jsonrpc"] = "2.0"
-            
-            print(json.dumps(response), flush=True)
-            
-        except EOFError:
-            break
-        except Exception as e:
-            logger.error(f"Server error: {e}")
+    await run_stdio_server(server.handle_request)
 
 
 if __name__ == "__main__":
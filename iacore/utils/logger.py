@@ -1,11 +1,80 @@
 """
 Logging utilities for IA_Core.
+
+Loggers configured through setup_logger share one console handler and one
+rotating file handler per log file, so a record is formatted once per
+destination no matter how many modules log. Those handlers run on
+QueueListener threads; loggers only enqueue records, so logging never
+blocks the caller (or the event loop) on terminal or disk I/O.
 """
 
+import atexit
 import logging
+import queue
 import sys
+import threading
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_CONSOLE_FORMATTER = logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+_FILE_FORMATTER = logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+)
+
+_HANDLERS_LOCK = threading.Lock()
+_CONSOLE_HANDLER: Optional[QueueHandler] = None
+# Queue handlers for rotating log files, keyed by resolved path
+_FILE_HANDLERS: Dict[Path, QueueHandler] = {}
+_LISTENERS: List[QueueListener] = []
+
+
+def _queued(target: logging.Handler) -> QueueHandler:
+    """Front target with a queue drained by a background listener thread."""
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, target)
+    listener.start()
+    _LISTENERS.append(listener)
+    return QueueHandler(records)
+
+
+def _console_handler() -> QueueHandler:
+    """Return the shared console handler, creating it on first use."""
+    global _CONSOLE_HANDLER
+    with _HANDLERS_LOCK:
+        if _CONSOLE_HANDLER is None:
+            target = logging.StreamHandler(sys.stdout)
+            target.setFormatter(_CONSOLE_FORMATTER)
+            _CONSOLE_HANDLER = _queued(target)
+        return _CONSOLE_HANDLER
+
+
+def _file_handler(log_file: Path) -> QueueHandler:
+    """Return the shared handler for log_file, creating it on first use."""
+    path = log_file.resolve()
+    with _HANDLERS_LOCK:
+        handler = _FILE_HANDLERS.get(path)
+        if handler is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            target = RotatingFileHandler(
+                path,
+                maxBytes=10 * 1024 * 1024,  # 10MB
+                backupCount=5,
+            )
+            target.setFormatter(_FILE_FORMATTER)
+            handler = _queued(target)
+            _FILE_HANDLERS[path] = handler
+        return handler
+
+
+@atexit.register
+def _stop_listeners():
+    """Flush queued records before the interpreter exits."""
+    while _LISTENERS:
+        _LISTENERS.pop().stop()
 
 
 def setup_logger(
@@ -15,45 +84,27 @@ def setup_logger(
 ) -> logging.Logger:
     """
     Setup logger with console and file handlers.
-    
+
     Args:
         name: Logger name
         level: Logging level
         log_file: Optional log file path
-        
+
     Returns:
         Configured logger
     """
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
+
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-    
+
+    # Shared handlers leave level filtering to each logger
+    logger.addHandler(_console_handler())
+
     # File handler (if specified)
     if log_file:
-        log_file.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = RotatingFileHandler(
-            log_file,
-            maxBytes=10 * 1024 * 1024,  # 10MB
-            backupCount=5,
-        )
-        file_handler.setLevel(level)
-        file_formatter = logging.Formatter(
-            "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-        )
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-    
+        logger.addHandler(_file_handler(Path(log_file)))
+
     return logger
@@ -1,3 +1,4 @@
+import os
 from setuptools import setup, find_packages
 from pathlib import Path
 
@@ -8,6 +9,19 @@ readme = Path("README.md").read_text(encoding="utf-8")
 requirements = Path("requirements.txt").read_text().splitlines()
 requirements = [r for r in requirements if r and not r.startswith("#")]
 
+# Optional: IACORE_MYPYC=1 compiles the MCP server hot paths with mypyc
+# (pip install mypy first). The default install stays pure Python.
+ext_modules = []
+if os.getenv("IACORE_MYPYC") == "1":
+    from mypyc.build import mypycify
+
+    ext_modules = mypycify([
+        "--ignore-missing-imports",  # Optional deps need not be installed at build time
+        "iacore/mcp/_stdio.py",
+        "iacore/mcp/memory_server.py",
+        "iacore/mcp/tools_server.py",
+    ])
+
 setup(
     name="iacore",
     version="0.1.0",
@@ -31,6 +45,7 @@ setup(
     ],
     python_requires=">=3.9",
     install_requires=requirements,
+    ext_modules=ext_modules,
     entry_points={
         "console_scripts": [
             "iacore=iacore.cli.main:app",